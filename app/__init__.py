@@ -1,7 +1,18 @@
-from .core import (
-    Indexer,
-    SearchInfoEngine,
-    SearchFileDirEngine,
-    SearchFileDirInfoEngine,
-)
-from .cli import CLIApplication
+from importlib import import_module
+
+# modules are imported on first access, so starting CLI imports only what
+# the executed command needs
+_EXPORTS = {
+    "Indexer": ".core",
+    "SearchInfoEngine": ".core",
+    "SearchFileDirEngine": ".core",
+    "SearchFileDirInfoEngine": ".core",
+    "CLIApplication": ".cli",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
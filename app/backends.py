@@ -0,0 +1,124 @@
+from pathlib import Path
+from .cache import QueryCache, index_generation
+from .exceptions import CLIIndexerException
+from . import context
+from .index import Index, IndexDB
+from .interfaces import Searchable
+from .mapped import MappedIndex, MappedIndexWriter
+from .shards import (
+    DEFAULT_SHARDS,
+    MANIFEST_SUFFIX,
+    ShardedIndex,
+    ShardedIndexWriter,
+    valid_manifest,
+)
+from .stats import timer
+
+SUFFIXES = (".pkl", ".idx", ".db", ".sqlite", MANIFEST_SUFFIX)
+
+
+def check_suffix(fpath: Path) -> None:
+    """Raise CLIIndexerException if suffix of `fpath` is not supported index."""
+    if fpath.suffix not in SUFFIXES:
+        raise CLIIndexerException(
+            f"Expected {fpath} to be one of {', '.join(SUFFIXES)} files"
+        )
+
+
+def create_index(
+    dst: Path, compression: str | None = None
+) -> Index | MappedIndexWriter | IndexDB | ShardedIndexWriter:
+    """Create empty index, its format is chosen by suffix of `dst`.
+
+    Manifest of sharded index gets default number of .pkl shards.
+
+    Args:
+        dst (Path): path to index file
+        compression (str | None): compression of lines, only for .idx file
+
+    Raises:
+        CLIIndexerException: raised if suffix of `dst` is not supported or
+            index cannot be compressed
+    """
+    check_suffix(dst)
+    if compression is not None and not MappedIndexWriter.valid_idx(dst):
+        raise CLIIndexerException("only .idx index can be compressed")
+    if valid_manifest(dst):
+        return ShardedIndexWriter.create(dst, DEFAULT_SHARDS)
+    if MappedIndexWriter.valid_idx(dst):
+        return MappedIndexWriter(dst, compression)
+    if IndexDB.valid_db(dst):
+        return IndexDB(dst)
+    return Index(dst)
+
+
+def load_index(fpath: Path) -> Searchable:
+    """Load index created by `create_index`.
+
+    Index is taken from `Context.index_cache` if the cache is set.
+
+    Raises:
+        CLIIndexerException: raised if index cannot be loaded
+    """
+    with timer("load"):
+        if (cache := context.Context.index_cache) is not None:
+            return cache.load(fpath)
+        return _load_index(fpath)
+
+
+def _load_index(fpath: Path) -> Searchable:
+    check_suffix(fpath)
+    if valid_manifest(fpath):
+        return ShardedIndex.load(fpath)
+    if MappedIndexWriter.valid_idx(fpath):
+        return MappedIndex.load(fpath)
+    if IndexDB.valid_db(fpath):
+        return IndexDB.load(fpath)
+    return Index.load(fpath)
+
+
+class IndexCache:
+    """Loaded indexes kept by path, index is loaded again when its file changes."""
+
+    def __init__(self):
+        self._indexes: dict[Path, tuple[tuple[int, int, int], Searchable]] = {}
+        self._queries: dict[Path, QueryCache] = {}
+
+    def load(self, fpath: Path) -> Searchable:
+        key = fpath.resolve()
+        try:
+            st = key.stat()
+        except OSError:
+            self._indexes.pop(key, None)
+            return _load_index(fpath)
+
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        index = _load_index(fpath)
+        self._indexes[key] = (signature, index)
+        return index
+
+    def queries(self, fpath: Path) -> QueryCache:
+        """Query cache of index, kept in memory until index file changes."""
+        key = fpath.resolve()
+        generation = index_generation(fpath)
+        cache = self._queries.get(key)
+        if cache is None or cache.generation != generation:
+            cache = self._queries[key] = QueryCache(generation)
+        return cache
+
+
+def open_query_cache(fpath: Path) -> QueryCache | None:
+    """Query cache of index `fpath`, None if caching is not enabled.
+
+    Server keeps caches in memory, otherwise cache is stored next to index
+    when `--cache` option is used.
+    """
+    if (cache := context.Context.index_cache) is not None:
+        return cache.queries(fpath)
+    if context.Context.query_cache:
+        return QueryCache.load(fpath)
+    return None
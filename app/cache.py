@@ -0,0 +1,139 @@
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Iterable, Iterator
+from .entity import OutputInfo
+
+FORMAT_VERSION = 2
+MAX_ENTRIES = 128
+MAX_SIZE = 16 << 20
+ENTRY_OVERHEAD = 64
+
+Entry = tuple[int, list[OutputInfo]]
+
+
+def cache_path(index_file: Path) -> Path:
+    return index_file.with_name(index_file.name + ".cache")
+
+
+def index_generation(index_file: Path) -> tuple[str, int, int, int] | None:
+    """Identify content of index file, None if file does not exist."""
+    try:
+        st = index_file.stat()
+    except OSError:
+        return None
+    return str(index_file.resolve()), st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _size(results: list[OutputInfo]) -> int:
+    """Rough number of characters held by `results`."""
+    return sum(
+        ENTRY_OVERHEAD
+        + len(out.fpath)
+        + sum(map(len, out.occurances.lines))
+        for out in results
+    )
+
+
+class QueryCache:
+    """Results of searches in one generation of index.
+
+    Least recently used results are evicted, when there are more than
+    `max_entries` of them or they hold more than `max_size` characters.
+    Cache with `path` can be stored next to its index and is loaded only
+    while index file stays the same.
+    """
+
+    def __init__(
+        self,
+        generation: tuple[str, int, int, int] | None,
+        path: Path | None = None,
+        max_entries: int = MAX_ENTRIES,
+        max_size: int = MAX_SIZE,
+    ):
+        self.generation = generation
+        self.path = path
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.created = ""
+        self._entries: OrderedDict[Hashable, Entry] = OrderedDict()
+        self._size = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> list[OutputInfo] | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, results: list[OutputInfo]):
+        if (size := _size(results)) > self.max_size:
+            return
+        if (old := self._entries.pop(key, None)) is not None:
+            self._size -= old[0]
+        self._entries[key] = (size, results)
+        self._size += size
+        while len(self._entries) > self.max_entries or self._size > self.max_size:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= evicted
+        self._dirty = True
+
+    def record(
+        self, key: Hashable, results: Iterable[OutputInfo]
+    ) -> Iterator[OutputInfo]:
+        """Yield `results`, store them under `key` once all were yielded."""
+        collected = []
+        for out in results:
+            collected.append(out)
+            yield out
+        self.put(key, collected)
+        self.dump()
+
+    def dump(self):
+        """Store cache to its path, failure to write only leaves cache unsaved."""
+        if self.path is None or not self._dirty:
+            return
+        state = {
+            "version": FORMAT_VERSION,
+            "generation": self.generation,
+            "created": self.created,
+            "entries": [(k, results) for k, (_, results) in self._entries.items()],
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with tmp.open("wb") as f:
+                pickle.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            return
+        self._dirty = False
+
+    @staticmethod
+    def load(index_file: Path) -> "QueryCache":
+        """Load cache stored next to `index_file`, empty one if it is stale."""
+        generation = index_generation(index_file)
+        path = cache_path(index_file)
+        cache = QueryCache(generation, path)
+        try:
+            with path.open("rb") as f:
+                state = pickle.load(f)
+        except Exception:
+            return cache
+
+        if (
+            not isinstance(state, dict)
+            or state.get("version") != FORMAT_VERSION
+            or generation is None
+            or state.get("generation") != generation
+        ):
+            return cache
+
+        cache.created = state["created"]
+        for key, results in state["entries"]:
+            cache.put(key, results)
+        cache._dirty = False
+        return cache
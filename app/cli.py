@@ -4,9 +4,14 @@ from .exceptions import (
     InvalidCommandException,
     CLIIndexerException,
 )
+import os
 import sys
+from pathlib import Path
+from typing import Callable
 from .measure import measure_time
-from .command import AbstractCommand
+from .output import status
+from .stats import instrument
+from .command.abs import AbstractCommand
 
 
 def parse_input() -> tuple[list[str], str, list[str]]:
@@ -16,7 +21,7 @@ def parse_input() -> tuple[list[str], str, list[str]]:
     options = []
     i = 1
     for arg in sys.argv[1:]:
-        if arg.startswith("--"):
+        if arg.startswith("--") or arg == "-0":
             options.append(arg)
             i += 1
         else:
@@ -39,13 +44,29 @@ class HelpCommand(AbstractCommand):
     doc: str = f"""Find files, dirs or file content in specified directory.
 [OPTIONS...] COMMAND ARGUMENTS...
 OPTIONS:
-    --no-colors     turn off colors
+    --no-colors             turn off colors
+    --colors                keep colors when output is not a terminal
+    --max-size=SIZE         skip files larger than SIZE (e.g. 512K, 10M)
+    --ext=EXT,...           read only files with listed extensions
+    --exclude-ext=EXT,...   skip files with listed extensions
+    --binary                do not skip binary files
+    --no-ignore             do not respect .gitignore and .ignore files
+    --follow-links          enter symbolic links to directories
+    --server[=SOCKET]       send command to server started by `serve`
+    --cache                 store results of index searches next to index
+    --json                  print results as JSON array
+    --jsonl                 print results as JSON objects, one per line
+    -0, --null              print only paths of results, each ended by NUL
+    --stats[=FORMAT]        print timers and counters of command to stderr,
+                            FORMAT is text (default) or json
+    --profile[=FILE]        write cProfile stats to FILE (default
+                            cli-indexer.prof) and allocations to FILE.mem
 
 COMMANDS:"""
 
     def execute(self, args: list[str] = list()) -> None:
         print(
-            "\n".join(map(lambda c: c.doc.strip(), context.Context.commands.values()))
+            "\n".join(map(lambda doc: doc.strip(), context.all_docs()))
         )
 
 
@@ -57,6 +78,12 @@ class CLIApplication:
     def register_command(command: AbstractCommand):
         context.register_command(command)
 
+    @staticmethod
+    def register_lazy_command(
+        name: str, loader: Callable[[], AbstractCommand], doc: str | None = None
+    ):
+        context.register_lazy_command(name, loader, doc)
+
     @staticmethod
     def print_help():
         try:
@@ -75,25 +102,57 @@ class CLIApplication:
             self.print_help()
             return 1
 
+        if not sys.stdout.isatty():
+            context.turn_off_colors()
+        try:
+            return self.dispatch(options, command, args)
+        except BrokenPipeError:
+            # reader of output (e.g. head) exited, the rest of output is dropped
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return 1
+
+    def dispatch(self, options: list[str], command: str, args: list[str]) -> int:
+        """Apply global options and execute command, return exit status."""
         try:
             context.apply_options(options)
         except CLIIndexerException as e:
-            print(str(e) + "\n")
+            status(str(e) + "\n")
             self.print_help()
             return 1
 
+        if context.Context.server is not None:
+            return self.forward(context.Context.server, options, command, args)
+
         try:
             cmd_object = context.get_command(command)
         except InvalidCommandException as e:
-            print(str(e) + "\n")
+            status(str(e) + "\n")
             self.print_help()
             return 1
 
         try:
-            cmd_object.execute(args)
+            with instrument():
+                cmd_object.execute(args)
         except CLIIndexerException as e:
-            print(str(e) + "\n")
-            print(cmd_object.doc.strip())
+            status(str(e) + "\n")
+            status(cmd_object.doc.strip())
             return 1
 
         return 0
+
+    @staticmethod
+    def forward(
+        socket_path: Path, options: list[str], command: str, args: list[str]
+    ) -> int:
+        """Execute command by server listening on `socket_path`."""
+        options = [opt for opt in options if opt.partition("=")[0] != "--server"]
+        if not context.Context.colors:
+            options.append("--no-colors")
+        from . import server
+
+        try:
+            return server.request(socket_path, options, command, args)
+        except CLIIndexerException as e:
+            status(str(e))
+            return 1
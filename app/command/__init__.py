@@ -1,5 +1,20 @@
-from .searchfd import SearchFileDirCommand
-from .index import IndexCommand
-from .info import SearchInfoCommand
-from .abs import Command, AbstractCommand
-from .searchfdi import SearchFileDirInfoCommand
+from importlib import import_module
+
+# modules are imported on first access, see app/__init__.py
+_EXPORTS = {
+    "SearchFileDirCommand": ".searchfd",
+    "IndexCommand": ".index",
+    "SearchInfoCommand": ".info",
+    "Command": ".abs",
+    "AbstractCommand": ".abs",
+    "SearchFileDirInfoCommand": ".searchfdi",
+    "ServeCommand": ".serve",
+    "WatchCommand": ".watch",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
@@ -1,4 +1,11 @@
 from abc import ABC, abstractmethod, abstractproperty
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Hashable, Iterable
+from ..exceptions import ArgumentException
+from ..entity import OutputInfo, SearchOptions
+from ..interfaces import Searchable
+from .. import context
 
 
 class AbstractCommand(ABC):
@@ -19,3 +26,163 @@ class Command(AbstractCommand):
     @abstractmethod
     def parse_args(self, args: list[str]):
         ...
+
+    @staticmethod
+    def pop_flag(args: list[str], *names: str) -> bool:
+        """Remove flag from arguments.
+
+        Args:
+            args (list[str]): arguments, modified in place
+            names (str): alternative names of the flag
+
+        Returns:
+            bool: True if flag was present
+        """
+        found = False
+        for name in names:
+            while name in args:
+                args.remove(name)
+                found = True
+        return found
+
+    @staticmethod
+    def pop_option(args: list[str], *names: str) -> str | None:
+        """Remove option together with its value from arguments.
+
+        Args:
+            args (list[str]): arguments, modified in place
+            names (str): alternative names of the option
+
+        Raises:
+            ArgumentException: raised if option has no value
+
+        Returns:
+            str | None: value of the option, None if option not present
+        """
+        value = None
+        for name in names:
+            while name in args:
+                i = args.index(name)
+                if i + 1 >= len(args):
+                    raise ArgumentException(f"missing value of option {name}")
+                value = args[i + 1]
+                del args[i : i + 2]
+        return value
+
+    @staticmethod
+    def pop_patterns(args: list[str]) -> list[str]:
+        """Remove patterns of `-e pattern` options and patterns read from file
+        of `-f pattern_file` options (one per line) from arguments.
+
+        Args:
+            args (list[str]): arguments, modified in place
+
+        Raises:
+            ArgumentException: raised if option has no value or pattern file
+                cannot be read
+
+        Returns:
+            list[str]: patterns in order of options, empty if there are none
+        """
+        patterns: list[str] = []
+        i = 0
+        while i < len(args):
+            name = args[i]
+            if name not in ("-e", "-f"):
+                i += 1
+                continue
+            if i + 1 >= len(args):
+                raise ArgumentException(f"missing value of option {name}")
+            value = args[i + 1]
+            del args[i : i + 2]
+
+            if name == "-e":
+                patterns.append(value)
+                continue
+            try:
+                with open(value, encoding="utf-8") as f:
+                    patterns.extend(
+                        line for line in f.read().splitlines() if line
+                    )
+            except (OSError, UnicodeDecodeError):
+                raise ArgumentException(f"cannot read pattern file {value}")
+        return patterns
+
+    @staticmethod
+    def parse_jobs(value: str | None) -> int:
+        """Parse number of worker processes, 1 if not specified."""
+        if value is None:
+            return 1
+        if not value.isdigit() or int(value) < 1:
+            raise ArgumentException(f"invalid number of jobs: {value}")
+        return int(value)
+
+    @staticmethod
+    def parse_count(value: str | None, what: str) -> int | None:
+        """Parse positive limit of `what`, None if not specified."""
+        if value is None:
+            return None
+        if not value.isdigit() or int(value) < 1:
+            raise ArgumentException(f"invalid {what}: {value}")
+        return int(value)
+
+    def pop_search_options(
+        self, args: list[str], content: bool = True
+    ) -> SearchOptions:
+        """Remove options shared by searching commands from arguments.
+
+        Args:
+            args (list[str]): arguments, modified in place
+            content (bool): command searches content of files, otherwise
+                options limiting searched lines are rejected
+
+        Raises:
+            ArgumentException: raised if option is invalid or not supported
+        """
+        if not content:
+            for name in ("-l", "--files-with-matches", "-m", "--max-count"):
+                if name in args:
+                    raise ArgumentException(f"{name} applies only to file content")
+        return SearchOptions(
+            jobs=self.parse_jobs(self.pop_option(args, "-j", "--jobs")),
+            ordered=not self.pop_flag(args, "--unordered"),
+            file_filter=context.Context.file_filter,
+            regex=self.pop_flag(args, "--regex"),
+            files_only=self.pop_flag(args, "-l", "--files-with-matches"),
+            max_count=self.parse_count(
+                self.pop_option(args, "-m", "--max-count"), "max count"
+            ),
+            limit=self.parse_count(self.pop_option(args, "--limit"), "limit"),
+        )
+
+    @staticmethod
+    def results_key(options: SearchOptions) -> SearchOptions:
+        """Part of query cache key given by options that change results."""
+        return replace(options, jobs=1, ordered=True)
+
+    @staticmethod
+    def search_cached(
+        index_file: Path,
+        key: Hashable,
+        search: Callable[[Searchable], Iterable[OutputInfo]],
+    ) -> tuple[str, Iterable[OutputInfo]]:
+        """Search index stored in `index_file` with `search`.
+
+        If query cache is enabled and holds results for `key`, index is not
+        loaded at all.
+
+        Returns:
+            creation time of the index and results
+        """
+        # index backends are imported only by commands reading an index
+        from ..backends import load_index, open_query_cache
+
+        cache = open_query_cache(index_file)
+        if cache is not None and (results := cache.get(key)) is not None:
+            return cache.created, results
+
+        index = load_index(index_file)
+        if cache is None:
+            return index.created, search(index)
+        cache.created = index.created
+        return index.created, cache.record(key, search(index))
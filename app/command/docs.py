@@ -0,0 +1,95 @@
+"""Usage of commands.
+
+Kept apart from command modules, so `help` prints usage of every command
+without importing engines and index backends.
+"""
+from ..shards import DEFAULT_SHARDS
+
+INDEX = f"""
+index root_dir [-o output_file] [--update] [-j jobs]
+    [--shards count] [--shard-type suffix] [--shard number] [--compress method]
+    Create index for root_dir
+    - root_dir: directory to index
+    - output_file: path to output file
+        .pkl file is loaded to memory as a whole
+        .idx file is memory mapped, only needed parts are read
+        .db or .sqlite file is sqlite database with full text index
+        .shards file is manifest of index split into shards, files
+            are assigned to shards by hash of their absolute path
+        default ./index.pkl
+    - --update: update existing .pkl output_file, read only added or changed files
+    - jobs: number of processes reading files, default 1
+    - count: number of shards, default {DEFAULT_SHARDS}
+    - suffix: type of shard files (.pkl, .idx, .db), default .pkl
+    - number: create again (or update) only shard with this number
+        of existing index of the same root_dir
+    - method: compress lines of .idx index (or .idx shards) in blocks,
+        zlib or lzma, only blocks of candidate files are read when searching"""
+
+INFO = """
+info (inform | -e pattern... | -f pattern_file) (root_dir | -i index_file)
+    [-j jobs] [--unordered] [--regex] [-l] [-m count] [--limit count]
+    Find information within files
+    - inform: information to find
+    - pattern: one of several patterns searched at once, option can repeat,
+        lines are tagged with patterns found in them
+    - pattern_file: file with one pattern per line
+    - root_dir: directory to search
+    - index_file:
+        if not specified, autocreate index first (more runtime required)
+        if specified, use index file
+    - jobs: number of processes searching root_dir or shards of index, default 1
+    - --unordered: print results as soon as they are found
+    - --regex: search regular expressions instead of plain text
+    - -l: print only paths of matching files
+    - -m: stop reading file after count matching lines
+    - --limit: stop searching after count matching files"""
+
+SEARCHFD = """
+searchfd name (root | -i index_file) [-j jobs] [--unordered] [--regex]
+    [--limit count]
+    Search files or directories
+    - name: file or directory name to search
+    - root: searching root directory
+    - index_file:
+        if not specified, autocreate index first
+        if specified, use index file
+    - jobs: number of processes searching root or shards of index, default 1
+    - --unordered: print results as soon as they are found
+    - --regex: search regular expressions instead of plain text
+    - --limit: stop searching after count results"""
+
+SEARCHFDI = """
+searchfdi (info | -e pattern... | -f pattern_file) name (root | -i index_file)
+    [-j jobs] [--unordered] [--regex] [-l] [-m count] [--limit count]
+    Search information within specified file or directory
+    - info: information to search for
+    - pattern: one of several patterns searched at once, option can repeat,
+        lines are tagged with patterns found in them
+    - pattern_file: file with one pattern per line
+    - name: name (can be part of the path) where information should be found
+    - root: searhing root path
+    - index_file: path to the index file
+    - jobs: number of processes searching root or shards of index, default 1
+    - --unordered: print results as soon as they are found
+    - --regex: search regular expressions instead of plain text
+    - -l: print only paths of matching files
+    - -m: stop reading file after count matching lines
+    - --limit: stop searching after count matching files
+"""
+
+WATCH = """
+watch root_dir [-o output_file] [--poll] [-n seconds]
+    Keep index of root_dir up to date while files change
+    - root_dir: directory to watch
+    - output_file: .pkl index, created if it does not exist, default ./index.pkl
+    - --poll: check files periodically instead of using inotify
+    - seconds: interval of polling, default 1"""
+
+SERVE = """
+serve [index_file...] [-s socket]
+    Keep indexes loaded and answer commands sent with --server option
+    - index_file: index to load on start, other indexes are loaded
+        by the first command using them and kept loaded
+    - socket: path of unix socket, default cli-indexer.sock in $XDG_RUNTIME_DIR
+        or in private directory in tmp"""
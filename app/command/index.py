@@ -1,25 +1,49 @@
-from typing import Protocol
+from typing import Callable, Protocol
 from .abs import Command
+from . import docs
 from ..exceptions import ArgumentException, CLIIndexerException
 from pathlib import Path
-from ..index import IndexDB, Index
-from ..interfaces import Insertable
+from ..backends import check_suffix, create_index
+from ..index import Index, IndexDB
+from ..interfaces import Insertable, Updatable
+from ..mapped import COMPRESSIONS, MappedIndex, MappedIndexWriter
+from ..shards import (
+    DEFAULT_SHARDS,
+    ShardedIndex,
+    ShardedIndexWriter,
+    shard_of,
+    valid_manifest,
+    write_manifest,
+)
+from ..filters import FileFilter
+from .. import context
 
 
 class Indexer(Protocol):
-    def make_index(self, root: Path, index: Insertable) -> None:
+    def make_index(
+        self,
+        root: Path,
+        index: Insertable,
+        jobs: int,
+        file_filter: FileFilter,
+        accepts: Callable[[str], bool] | None = None,
+    ) -> None:
+        ...
+
+    def update_index(
+        self,
+        root: Path,
+        index: Updatable,
+        jobs: int,
+        file_filter: FileFilter,
+        accepts: Callable[[str], bool] | None = None,
+    ) -> None:
         ...
 
 
 class IndexCommand(Command):
     name: str = "index"
-    doc: str = f"""
-{name} root_dir [-o output_file]
-    Create index for root_dir
-    - root_dir: directory to index
-    - output_file: path to output file
-        must be .pkl file
-        default ./index.pkl"""
+    doc: str = docs.INDEX
 
     default_dst = Path("./index.pkl")
 
@@ -28,27 +52,178 @@ class IndexCommand(Command):
 
         self.root_dir_key = "root_dir"
         self.output_file_key = "output_file"
+        self.update_key = "update"
+        self.jobs_key = "jobs"
+        self.shards_key = "shards"
+        self.shard_type_key = "shard_type"
+        self.shard_key = "shard"
+        self.compress_key = "compress"
+
+    @staticmethod
+    def parse_compression(value: str | None) -> str | None:
+        if value is not None and value not in COMPRESSIONS:
+            raise ArgumentException(f"invalid compression: {value}")
+        return value
+
+    @staticmethod
+    def parse_shard(value: str | None) -> int | None:
+        if value is None:
+            return None
+        if not value.isdigit():
+            raise ArgumentException(f"invalid shard number: {value}")
+        return int(value)
 
     def parse_args(self, args: list[str]):
+        args = list(args)
+        output = {
+            self.update_key: self.pop_flag(args, "--update"),
+            self.jobs_key: self.parse_jobs(self.pop_option(args, "-j", "--jobs")),
+            self.shards_key: self.parse_count(
+                self.pop_option(args, "--shards"), "number of shards"
+            ),
+            self.shard_type_key: self.pop_option(args, "--shard-type"),
+            self.shard_key: self.parse_shard(self.pop_option(args, "--shard")),
+            self.compress_key: self.parse_compression(
+                self.pop_option(args, "--compress")
+            ),
+        }
+
         match args:
             case [root_dir]:
-                return {self.root_dir_key: Path(root_dir)}
+                output[self.root_dir_key] = Path(root_dir)
             case [root_dir, "-o", output_file]:
-                return {
-                    self.root_dir_key: Path(root_dir),
-                    self.output_file_key: Path(output_file),
-                }
+                output[self.root_dir_key] = Path(root_dir)
+                output[self.output_file_key] = Path(output_file)
             case _:
                 raise ArgumentException("invalid arguments")
+        return output
 
     def execute(self, args: list[str]) -> None:
         parsed = self.parse_args(args)
         dst: Path = parsed.get(self.output_file_key, self.default_dst)
 
-        dst.unlink(missing_ok=True)
-        index = Index(dst)
+        sharding = (
+            parsed[self.shards_key],
+            parsed[self.shard_type_key],
+            parsed[self.shard_key],
+        )
+        if valid_manifest(dst):
+            self.execute_sharded(parsed, dst)
+            return
+        if sharding != (None, None, None):
+            raise ArgumentException("shards need .shards output_file")
+
+        root: Path = parsed[self.root_dir_key]
+        jobs: int = parsed[self.jobs_key]
+        compression: str | None = parsed[self.compress_key]
+
+        if parsed[self.update_key] and not Index.valid_pkl(dst):
+            raise ArgumentException("only .pkl index can be updated")
+        if compression is not None and not MappedIndexWriter.valid_idx(dst):
+            raise ArgumentException("only .idx index can be compressed")
+
+        if parsed[self.update_key] and dst.is_file():
+            index = Index.load(dst)
+            index.dst = dst
+            message = "Updated index file"
+        else:
+            check_suffix(dst)
+            # other indexes replace old file only when they are complete
+            if IndexDB.valid_db(dst):
+                dst.unlink(missing_ok=True)
+            index = create_index(dst, compression)
+            message = "Created index file"
+
+        file_filter = context.Context.file_filter
+        if isinstance(index, Index):
+            self.indexer.update_index(root, index, jobs, file_filter)
+        else:
+            self.indexer.make_index(root, index, jobs, file_filter)
+        index.dump()
+
+        print(f"{message}: {dst}")
+
+    def execute_sharded(self, parsed: dict, dst: Path):
+        root: Path = parsed[self.root_dir_key]
+        jobs: int = parsed[self.jobs_key]
+        file_filter = context.Context.file_filter
+
+        if (number := parsed[self.shard_key]) is not None:
+            self.rebuild_shard(parsed, dst, number)
+            return
+
+        if parsed[self.update_key] and dst.is_file():
+            if (
+                parsed[self.shards_key]
+                or parsed[self.shard_type_key]
+                or parsed[self.compress_key]
+            ):
+                raise ArgumentException("shards of updated index cannot change")
+            index = ShardedIndexWriter.open(dst, root)
+            message = "Updated index file"
+        else:
+            index = ShardedIndexWriter.create(
+                dst,
+                parsed[self.shards_key] or DEFAULT_SHARDS,
+                parsed[self.shard_type_key] or ".pkl",
+                parsed[self.compress_key],
+                root,
+            )
+            message = "Created index file"
+
+        if all(Index.valid_pkl(shard) for shard in index.shards):
+            self.indexer.update_index(root, index, jobs, file_filter)
+        else:
+            self.indexer.make_index(root, index, jobs, file_filter)
+        index.dump()
+
+        print(f"{message}: {dst} ({len(index.shards)} shards)")
+
+    def rebuild_shard(self, parsed: dict, dst: Path, number: int):
+        """Create again or update one shard of existing sharded index.
+
+        Shard created again keeps compression of the previous one.
+        """
+        if (
+            parsed[self.shards_key]
+            or parsed[self.shard_type_key]
+            or parsed[self.compress_key]
+        ):
+            raise ArgumentException("shards of existing index cannot change")
+        loaded = ShardedIndex.load(dst)
+        loaded.check_root(parsed[self.root_dir_key])
+        shards = loaded.shards
+        if number >= len(shards):
+            raise ArgumentException(
+                f"no shard {number}, index has {len(shards)} shards"
+            )
+
+        shard = shards[number]
+        if parsed[self.update_key] and Index.valid_pkl(shard) and shard.is_file():
+            index = Index.load(shard)
+            index.dst = shard
+        else:
+            compression = None
+            if MappedIndexWriter.valid_idx(shard) and shard.is_file():
+                try:
+                    compression = MappedIndex.load(shard).compression
+                except CLIIndexerException:
+                    pass  # damaged shard is created again without compression
+            shard.unlink(missing_ok=True)
+            index = create_index(shard, compression)
+
+        def accepts(path: str) -> bool:
+            return shard_of(path, len(shards)) == number
 
-        self.indexer.make_index(parsed[self.root_dir_key], index)
+        root: Path = parsed[self.root_dir_key]
+        jobs: int = parsed[self.jobs_key]
+        file_filter = context.Context.file_filter
+        if isinstance(index, Index):
+            self.indexer.update_index(root, index, jobs, file_filter, accepts)
+        else:
+            self.indexer.make_index(root, index, jobs, file_filter, accepts)
         index.dump()
+        # manifest is written again, so loaded copies and caches of index expire
+        write_manifest(dst, shards, loaded.root)
 
-        print(f"Created index file: {dst}")
+        print(f"Updated shard {number}: {shard}")
@@ -1,29 +1,31 @@
-from typing import Protocol, Iterable
+from typing import Protocol, Iterable, Sequence
 from .abs import Command
+from . import docs
 from ..exceptions import ArgumentException
-from ..entity import OutputInfo
+from ..entity import OutputInfo, SearchOptions
+from ..output import ResultOutput, status
 from pathlib import Path
-from ..index import Index, IndexDB
+from ..interfaces import Searchable
 
 
 class Engine(Protocol):
-    def search_runtime(self, information: str, root: Path) -> Iterable[OutputInfo]:
+    def search_runtime(
+        self, information: str | Sequence[str], root: Path, options: SearchOptions
+    ) -> Iterable[OutputInfo]:
         ...
 
-    def search_index(self, information: str, index: Index) -> Iterable[OutputInfo]:
+    def search_index(
+        self,
+        information: str | Sequence[str],
+        index: Searchable,
+        options: SearchOptions,
+    ) -> Iterable[OutputInfo]:
         ...
 
 
 class SearchInfoCommand(Command):
     name: str = "info"
-    doc: str = f"""
-{name} inform (root_dir | -i index_file)
-    Find information within files
-    - inform: information to find
-    - root_dir: directory to search
-    - index_file:
-        if not specified, autocreate index first (more runtime required)
-        if specified, use index file"""
+    doc: str = docs.INFO
 
     def __init__(self, engine: Engine):
         self.engine = engine
@@ -31,15 +33,22 @@ class SearchInfoCommand(Command):
         self.info_key = "info"
         self.root_dir_key = "root_dir"
         self.index_file_key = "index_file_key"
+        self.options_key = "options"
 
     def parse_args(self, args: list[str]):
-        output = {}
+        args = list(args)
+        output = {self.options_key: self.pop_search_options(args)}
+        if patterns := self.pop_patterns(args):
+            output[self.info_key] = tuple(patterns)
+        elif args:
+            output[self.info_key] = args.pop(0)
+        else:
+            raise ArgumentException("invalid arguments")
+
         match args:
-            case [info, root_dir]:
-                output[self.info_key] = info
+            case [root_dir]:
                 output[self.root_dir_key] = Path(root_dir)
-            case [info, "-i", index_file]:
-                output[self.info_key] = info
+            case ["-i", index_file]:
                 output[self.index_file_key] = Path(index_file)
             case _:
                 raise ArgumentException("invalid arguments")
@@ -48,21 +57,23 @@ class SearchInfoCommand(Command):
     def execute(self, args: list[str]) -> None:
         parsed = self.parse_args(args)
 
-        info: str = parsed[self.info_key]
+        info: str | tuple[str, ...] = parsed[self.info_key]
+        options: SearchOptions = parsed[self.options_key]
 
         if (root := parsed.get(self.root_dir_key)) is not None:
-            print(f"Finding information runtime")
-            it = self.engine.search_runtime(info, root)
+            status("Finding information runtime")
+            it = self.engine.search_runtime(info, root, options)
         else:
-            # index = IndexDB(parsed[self.index_file_key])
-            index = Index.load(parsed[self.index_file_key])
-            print(f"Loaded index from: {index.created}")
-            it = self.engine.search_index(info, index)
+            created, it = self.search_cached(
+                parsed[self.index_file_key],
+                (self.name, info, self.results_key(options)),
+                lambda index: self.engine.search_index(info, index, options),
+            )
+            status(f"Loaded index from: {created}")
 
-        count = 0
-        for item in it:
-            print(item.format())
-            count += 1
+        with ResultOutput(options.files_only, spaced=True) as out:
+            for item in it:
+                out.result(item)
 
-        if count == 0:
-            print("nothing found")
+        if out.count == 0:
+            status("nothing found")
@@ -1,29 +1,28 @@
 from typing import Protocol, Iterator
 from .abs import Command
+from . import docs
 from pathlib import Path
 from ..exceptions import ArgumentException
-from ..entity import OutputInfo
-from ..index import Index
+from ..entity import OutputInfo, SearchOptions
+from ..output import ResultOutput, status
+from ..interfaces import Searchable
 
 
 class Engine(Protocol):
-    def search_index(self, name_part: str, index: Index) -> Iterator[OutputInfo]:
+    def search_index(
+        self, name_part: str, index: Searchable, options: SearchOptions
+    ) -> Iterator[OutputInfo]:
         ...
 
-    def search_runtime(self, name_part: str, root: Path) -> Iterator[OutputInfo]:
+    def search_runtime(
+        self, name_part: str, root: Path, options: SearchOptions
+    ) -> Iterator[OutputInfo]:
         ...
 
 
 class SearchFileDirCommand(Command):
     name: str = "searchfd"
-    doc: str = f"""
-{name} name (root | -i index_file)
-    Search files or directories
-    - name: file or directory name to search
-    - root: searching root directory
-    - index_file:
-        if not specified, autocreate index first
-        if specified, use index file"""
+    doc: str = docs.SEARCHFD
 
     def __init__(self, engine: Engine) -> None:
         self.engine = engine
@@ -31,9 +30,11 @@ class SearchFileDirCommand(Command):
         self.name_key = "name"
         self.index_file_key = "index_file"
         self.root_key = "root"
+        self.options_key = "options"
 
     def parse_args(self, args: list[str]):
-        out = {}
+        args = list(args)
+        out = {self.options_key: self.pop_search_options(args, content=False)}
 
         match args:
             case [name, root]:
@@ -51,16 +52,22 @@ class SearchFileDirCommand(Command):
         parsed = self.parse_args(args)
 
         if (index_path := parsed.get(self.index_file_key)) is not None:
-            index: Index = Index.load(index_path)
-            it = self.engine.search_index(parsed[self.name_key], index)
+            name: str = parsed[self.name_key]
+            options: SearchOptions = parsed[self.options_key]
+            _, it = self.search_cached(
+                index_path,
+                (self.name, name, self.results_key(options)),
+                lambda index: self.engine.search_index(name, index, options),
+            )
         else:
             root: Path = parsed[self.root_key]
-            it = self.engine.search_runtime(parsed[self.name_key], root)
+            it = self.engine.search_runtime(
+                parsed[self.name_key], root, parsed[self.options_key]
+            )
 
-        c: bool = False
-        for out in it:
-            print(out.format(), end="")
-            c = True
+        with ResultOutput() as output:
+            for out in it:
+                output.result(out)
 
-        if not c:
-            print("nothing found")
+        if output.count == 0:
+            status("nothing found")
@@ -1,47 +1,55 @@
 from .abs import Command
-from typing import Protocol, Iterator
-from ..entity import OutputInfo
+from . import docs
+from typing import Protocol, Iterator, Sequence
+from ..entity import OutputInfo, SearchOptions
+from ..output import ResultOutput, status
 from ..exceptions import ArgumentException
 from pathlib import Path
-from ..index import Index
+from ..interfaces import Searchable
 
 
 class Engine(Protocol):
     def search_index(
-        self, name_part: str, inform: str, index: Index
+        self,
+        name_part: str,
+        inform: str | Sequence[str],
+        index: Searchable,
+        options: SearchOptions,
     ) -> Iterator[OutputInfo]:
         ...
 
     def search_runtime(
-        self, name_part: str, inform: str, root: Path
+        self,
+        name_part: str,
+        inform: str | Sequence[str],
+        root: Path,
+        options: SearchOptions,
     ) -> Iterator[OutputInfo]:
         ...
 
 
 class SearchFileDirInfoCommand(Command):
     name: str = "searchfdi"
-    doc: str = f"""
-{name} info name (root | -i index_file)
-    Search information within specified file or directory
-    - info: information to search for
-    - name: name (can be part of the path) where information should be found
-    - root: searhing root path
-    - index_file: path to the index file
-"""
+    doc: str = docs.SEARCHFDI
 
     def __init__(self, engine: Engine) -> None:
         self.engine = engine
 
     def parse_args(self, args: list[str]):
-        out = {}
+        args = list(args)
+        out = {"options": self.pop_search_options(args)}
+        if patterns := self.pop_patterns(args):
+            out["info"] = tuple(patterns)
+        elif args:
+            out["info"] = args.pop(0)
+        else:
+            raise ArgumentException("invalid arguments")
 
         match args:
-            case [info, name, root]:
-                out["info"] = info
+            case [name, root]:
                 out["name"] = name
                 out["root"] = Path(root)
-            case [info, name, "-i", index_file]:
-                out["info"] = info
+            case [name, "-i", index_file]:
                 out["name"] = name
                 out["index"] = Path(index_file)
             case _:
@@ -55,16 +63,20 @@ class SearchFileDirInfoCommand(Command):
         root = parsed.get("root")
         info = parsed["info"]
         name = parsed["name"]
+        options: SearchOptions = parsed["options"]
 
         if root is not None:
-            it = self.engine.search_runtime(name, info, root)
+            it = self.engine.search_runtime(name, info, root, options)
         else:
-            it = self.engine.search_index(name, info, Index.load(parsed["index"]))
+            _, it = self.search_cached(
+                parsed["index"],
+                (self.name, name, info, self.results_key(options)),
+                lambda index: self.engine.search_index(name, info, index, options),
+            )
 
-        c: bool = False
-        for out in it:
-            print(out.format(), end="")
-            c = True
+        with ResultOutput(options.files_only) as output:
+            for out in it:
+                output.result(out)
 
-        if not c:
-            print("nothing found")
+        if output.count == 0:
+            status("nothing found")
@@ -0,0 +1,54 @@
+from pathlib import Path
+from .abs import Command
+from . import docs
+from ..backends import IndexCache
+from ..exceptions import ArgumentException
+from ..server import Dispatch, IndexServer, default_socket
+from .. import context
+
+
+class ServeCommand(Command):
+    name: str = "serve"
+    doc: str = docs.SERVE
+
+    def __init__(self, dispatch: Dispatch):
+        self.dispatch = dispatch
+
+        self.index_files_key = "index_files"
+        self.socket_key = "socket"
+
+    def parse_args(self, args: list[str]):
+        args = list(args)
+        socket_path = self.pop_option(args, "-s", "--socket")
+        if any(arg.startswith("-") for arg in args):
+            raise ArgumentException("invalid arguments")
+        return {
+            self.socket_key: Path(socket_path) if socket_path else default_socket(),
+            self.index_files_key: [Path(arg) for arg in args],
+        }
+
+    def handle(self, options: list[str], command: str, args: list[str]) -> int:
+        """Execute one request, global options apply only to that request."""
+        context.reset_options()
+        if command == self.name:
+            print("server cannot serve itself")
+            return 1
+        return self.dispatch(options, command, args)
+
+    def execute(self, args: list[str]) -> None:
+        parsed = self.parse_args(args)
+        socket_path: Path = parsed[self.socket_key]
+
+        cache = IndexCache()
+        for index_file in parsed[self.index_files_key]:
+            index = cache.load(index_file)
+            print(f"Loaded index {index_file} from: {index.created}")
+        context.Context.index_cache = cache
+
+        server = IndexServer(socket_path, self.handle)
+        try:
+            server.serve_forever(lambda: print(f"Serving on {socket_path}", flush=True))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            context.Context.index_cache = None
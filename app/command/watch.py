@@ -0,0 +1,83 @@
+from pathlib import Path
+from .abs import Command
+from . import docs
+from ..exceptions import ArgumentException
+from ..index import Index
+from ..watch import POLL_INTERVAL, IndexWatcher, PollingBackend, default_backend
+from .. import context
+
+
+class WatchCommand(Command):
+    name: str = "watch"
+    doc: str = docs.WATCH
+
+    default_dst = Path("./index.pkl")
+
+    def __init__(self):
+        self.root_dir_key = "root_dir"
+        self.output_file_key = "output_file"
+        self.poll_key = "poll"
+        self.interval_key = "interval"
+
+    @staticmethod
+    def parse_interval(value: str | None) -> float:
+        if value is None:
+            return POLL_INTERVAL
+        try:
+            interval = float(value)
+        except ValueError:
+            interval = 0
+        if interval <= 0:
+            raise ArgumentException(f"invalid interval: {value}")
+        return interval
+
+    def parse_args(self, args: list[str]):
+        args = list(args)
+        output = {
+            self.poll_key: self.pop_flag(args, "--poll"),
+            self.interval_key: self.parse_interval(
+                self.pop_option(args, "-n", "--interval")
+            ),
+        }
+
+        match args:
+            case [root_dir]:
+                output[self.root_dir_key] = Path(root_dir)
+            case [root_dir, "-o", output_file]:
+                output[self.root_dir_key] = Path(root_dir)
+                output[self.output_file_key] = Path(output_file)
+            case _:
+                raise ArgumentException("invalid arguments")
+        return output
+
+    def execute(self, args: list[str]) -> None:
+        parsed = self.parse_args(args)
+        dst: Path = parsed.get(self.output_file_key, self.default_dst)
+        root: Path = parsed[self.root_dir_key]
+
+        if not Index.valid_pkl(dst):
+            raise ArgumentException("only .pkl index can be watched")
+        index = Index.load(dst) if dst.is_file() else Index(dst)
+        index.dst = dst
+
+        root_path = str(root)
+        if parsed[self.poll_key]:
+            backend = PollingBackend(root_path, parsed[self.interval_key])
+        else:
+            backend = default_backend(root_path)
+
+        watcher = IndexWatcher(root_path, index, context.Context.file_filter, backend)
+        try:
+            changed = watcher.start()
+            index.dump()
+            print(f"Watching {root}, {changed} files changed: {dst}", flush=True)
+
+            def on_change(count: int):
+                index.dump()
+                print(f"Updated index file: {dst}, {count} files changed", flush=True)
+
+            watcher.run(on_change)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
@@ -1,22 +1,173 @@
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
 from .exceptions import InvalidCommandException, CLIIndexerException
-
+from .filters import FileFilter, parse_extensions, parse_size
 from .interfaces import Executable
 
+if TYPE_CHECKING:
+    from .backends import IndexCache
+    from .stats import Stats
+
+STATS_FORMATS = ("text", "json")
+DEFAULT_PROFILE = "cli-indexer.prof"
+
 
 class Context:
     commands: dict[str, Executable] = {}
+    loaders: dict[str, Callable[[], Executable]] = {}
+    docs: dict[str, str] = {}
     colors: bool = True
+    file_filter: FileFilter = FileFilter()
+    server: Path | None = None
+    query_cache: bool = False
+    output_format: str = "text"
+    stats_format: str | None = None
+    profile: Path | None = None
+    stats: "Stats | None" = None
+    index_cache: "IndexCache | None" = None
+
+
+def reset_options():
+    """Restore state changed by global options to defaults."""
+    Context.colors = True
+    Context.file_filter = FileFilter()
+    Context.server = None
+    Context.query_cache = False
+    Context.output_format = "text"
+    Context.stats_format = None
+    Context.profile = None
 
 
 def turn_off_colors():
     Context.colors = False
 
 
-OPTIONS = {"--no-colors": turn_off_colors}
+def turn_on_colors():
+    Context.colors = True
+
+
+def json_output():
+    Context.output_format = "json"
+
+
+def json_lines_output():
+    Context.output_format = "jsonl"
+
+
+def null_output():
+    Context.output_format = "null"
+
+
+def include_binary():
+    Context.file_filter = replace(Context.file_filter, skip_binary=False)
+
+
+def disable_ignore_files():
+    Context.file_filter = replace(Context.file_filter, ignore_files=False)
+
+
+def follow_links():
+    Context.file_filter = replace(Context.file_filter, follow_links=True)
+
+
+def set_max_size(value: str):
+    Context.file_filter = replace(Context.file_filter, max_size=parse_size(value))
+
+
+def set_extensions(value: str):
+    Context.file_filter = replace(
+        Context.file_filter, extensions=parse_extensions(value)
+    )
+
+
+def set_excluded_extensions(value: str):
+    Context.file_filter = replace(
+        Context.file_filter, excluded_extensions=parse_extensions(value)
+    )
+
+
+def enable_query_cache():
+    Context.query_cache = True
+
+
+def enable_stats():
+    Context.stats_format = "text"
+
+
+def set_stats(value: str):
+    if value not in STATS_FORMATS:
+        expected = ", ".join(STATS_FORMATS)
+        raise CLIIndexerException(
+            f"invalid stats format `{value}`, expected one of {expected}"
+        )
+    Context.stats_format = value
+
+
+def enable_profile():
+    Context.profile = Path(DEFAULT_PROFILE)
+
+
+def set_profile(value: str):
+    Context.profile = Path(value)
+
+
+def use_server():
+    from .server import default_socket
+
+    Context.server = default_socket()
+
+
+def set_server(value: str):
+    Context.server = Path(value)
+
+
+OPTIONS = {
+    "--no-colors": turn_off_colors,
+    "--colors": turn_on_colors,
+    "--binary": include_binary,
+    "--no-ignore": disable_ignore_files,
+    "--follow-links": follow_links,
+    "--server": use_server,
+    "--cache": enable_query_cache,
+    "--json": json_output,
+    "--jsonl": json_lines_output,
+    "--null": null_output,
+    "-0": null_output,
+    "--stats": enable_stats,
+    "--profile": enable_profile,
+}
+VALUE_OPTIONS = {
+    "--max-size": set_max_size,
+    "--ext": set_extensions,
+    "--exclude-ext": set_excluded_extensions,
+    "--server": set_server,
+    "--stats": set_stats,
+    "--profile": set_profile,
+}
 
 
 def register_command(command: Executable):
     Context.commands[command.name] = command
+    Context.loaders[command.name] = lambda: command
+    Context.docs[command.name] = command.doc
+
+
+def register_lazy_command(
+    name: str, loader: Callable[[], Executable], doc: str | None = None
+):
+    """Register command created by `loader` when it is needed for the first time.
+
+    Modules of command are imported by `loader`, so they are not imported
+    at all when other command runs. Usage `doc` is printed by help without
+    loading the command.
+    """
+    Context.commands.pop(name, None)
+    Context.loaders[name] = loader
+    if doc is None:
+        Context.docs.pop(name, None)
+    else:
+        Context.docs[name] = doc
 
 
 def get_command(name: str) -> Executable:
@@ -31,15 +182,30 @@ def get_command(name: str) -> Executable:
     Returns:
         Command
     """
+    if (command := Context.commands.get(name)) is not None:
+        return command
     try:
-        return Context.commands[name]
+        loader = Context.loaders[name]
     except KeyError:
         raise InvalidCommandException(f"no such command `{name}`")
+    command = Context.commands[name] = loader()
+    return command
+
+
+def all_docs() -> list[str]:
+    """Usage of every registered command, commands without doc are loaded."""
+    return [
+        Context.docs[name] if name in Context.docs else get_command(name).doc
+        for name in Context.loaders
+    ]
 
 
 def apply_options(options: list[str]):
     for opt in options:
-        if opt in OPTIONS:
+        name, sep, value = opt.partition("=")
+        if not sep and opt in OPTIONS:
             OPTIONS[opt]()
+        elif sep and name in VALUE_OPTIONS:
+            VALUE_OPTIONS[name](value)
         else:
             raise CLIIndexerException(f"invalid option: {opt}")
@@ -1,206 +1,391 @@
-import os
-import re
+from dataclasses import replace
 from pathlib import Path
-from typing import Iterator, Callable, Generator, Protocol
+from typing import Iterable, Iterator, Callable, Sequence
 from .exceptions import CLIIndexerException
-from collections import defaultdict
-from .entity import OutputInfo, Occurance
-from .index import IndexDB, Index
-from .interfaces import Insertable, SearchEngine
-
-
-def walk_files(root: Path) -> Iterator[Path]:
-    for root_dir, _, files in filter(lambda item: len(item[2]) > 0, os.walk(root)):
-        dir_path: Path = Path(root_dir)
-        for file in files:
-            yield (dir_path / file)
-
-
-def walk(
-    root: Path, predicate: Callable[[Path], bool] = lambda p: True
-) -> Generator[Path, None, None]:
-    for root_dir, dirs, files in os.walk(root):
-        dir_path: Path = Path(root_dir)
-        for file in files:
-            if predicate(p := (dir_path / file)):
-                yield p
-        if not dirs:
-            if predicate(dir_path):
-                yield dir_path
-
-
-REGEX_REPLACEMENTS = {"*", "[", "]", "?", "+", ".", "<", ">", "(", ")"}
-
-
-def clean_regex(inform: str) -> str:
-    for symbol in REGEX_REPLACEMENTS:
-        inform = inform.replace(symbol, f"\\{symbol}")
-    return inform
+from functools import partial
+from itertools import islice
+from .entity import OutputInfo, Occurances, SearchOptions
+from .interfaces import Insertable, Searchable, SearchEngine, Updatable
+from .matcher import Matcher, make_matcher
+from .parallel import parallel_map
+from .scan import Needle, scan_lines, split_lines
+from .shards import ShardedIndex
+from .stats import count, timed, timed_walk
+from .filters import SNIFF_SIZE, FileFilter
+from .walker import walk, walk_entries, walk_files
+
+
+def read_lines(fpath: str, file_filter: FileFilter = FileFilter()) -> list[str] | None:
+    """Read lines of utf-8 text file, None if file cannot be read or is binary."""
+    try:
+        with open(fpath, "rb") as f:
+            count("files_read")
+            read = timed(f.read, "read")
+            head = read(SNIFF_SIZE)
+            if file_filter.is_binary(head):
+                count("bytes_read", len(head))
+                return None
+            data = head + read()
+        count("bytes_read", len(data))
+        lines = timed(split_lines, "decode")(data)
+    except Exception:
+        return None
+    count("files")
+    count("lines", len(lines))
+    return lines
+
+
+def _read_file(file_filter: FileFilter, fpath: str) -> tuple[str, list[str] | None]:
+    return fpath, read_lines(fpath, file_filter)
+
+
+def _read_changed(
+    file_filter: FileFilter, item: tuple[str, tuple[int, int, int]]
+) -> tuple[str, tuple[int, int, int], list[str] | None]:
+    fpath, signature = item
+    return fpath, signature, read_lines(fpath, file_filter)
 
 
 class Indexer:
     @staticmethod
-    def make_index(root: Path, index: Insertable) -> None:
+    def make_index(
+        root: Path,
+        index: Insertable,
+        jobs: int = 1,
+        file_filter: FileFilter = FileFilter(),
+        accepts: Callable[[str], bool] | None = None,
+    ) -> None:
+        """Insert files under `root` to `index`, only those `accepts` if given."""
         if not root.is_dir():
             raise CLIIndexerException(f"{root} not a dir")
-        for path in walk(root):
-            try:
-                index.insert(str(path), path.read_text(encoding="utf-8").splitlines())
-            except Exception:
-                pass
 
+        paths = timed_walk(walk_files(root, file_filter, jobs), jobs)
+        if accepts is not None:
+            paths = filter(accepts, paths)
+        read = partial(_read_file, file_filter)
+        for fpath, lines in parallel_map(read, paths, jobs):
+            if lines is not None:
+                index.insert(fpath, lines)
 
-class SearchInfoEngine(SearchEngine):
     @staticmethod
-    def search_index(information: str, index: Index) -> Iterator[OutputInfo]:
-        information = clean_regex(information)
-        pattern = re.compile(f"{information}")
-
-        for fpath, lines in index.files():
-            occurances = {}
-            for i, line in enumerate(lines, start=1):
-                if pattern.search(line) is None:
-                    continue
+    def update_index(
+        root: Path,
+        index: Updatable,
+        jobs: int = 1,
+        file_filter: FileFilter = FileFilter(),
+        accepts: Callable[[str], bool] | None = None,
+    ) -> None:
+        """Bring `index` up to date with files under `root`.
+
+        Only files whose (mtime_ns, size, inode) signature differs from the one
+        stored in index are read again. Files that no longer exist are removed.
+        Files are read by `jobs` worker processes, index is filled in walk order.
+        If `accepts` is given, other files are left out as if they did not exist.
+        """
+        if not root.is_dir():
+            raise CLIIndexerException(f"{root} not a dir")
 
-                spans = [m.span() for m in pattern.finditer(line)]
+        seen: set[str] = set()
 
-                occurances[i] = Occurance(line.rstrip(), spans)
+        def changed() -> Iterator[tuple[str, tuple[int, int, int]]]:
+            entries = walk_entries(root, file_filter, jobs)
+            for entry in timed_walk(entries, jobs):
+                fpath = entry.path
+                if accepts is not None and not accepts(fpath):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
 
-            if len(occurances) > 0:
-                yield OutputInfo(fpath, occurances)
+                seen.add(fpath)
+                signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+                if index.signature(fpath) != signature:
+                    yield fpath, signature
+
+        read = partial(_read_changed, file_filter)
+        for fpath, signature, lines in parallel_map(read, changed(), jobs):
+            if lines is None:
+                index.remove(fpath)
+            else:
+                index.insert(fpath, lines)
+            index.set_signature(fpath, signature)
+
+        for fpath in [p for p in index.signed_paths() if p not in seen]:
+            index.remove(fpath)
+
+
+def _occurances(
+    matcher: Matcher,
+    lines: Iterable[tuple[int, str]],
+    line_limit: int | None,
+    strip: bool = False,
+) -> Occurances:
+    """Collect matching lines, stop reading `lines` after `line_limit` of them."""
+    tagged = timed(matcher.tagged, "match")
+    occurances = Occurances()
+    examined = 0
+    for i, line in lines:
+        examined += 1
+        spans, patterns = tagged(line)
+        if spans:
+            occurances.add(i, line.rstrip() if strip else line, spans, patterns)
+            if len(occurances) == line_limit:
+                break
+    count("files")
+    count("lines", examined)
+    return occurances
+
+
+def _limit(
+    results: Iterable[OutputInfo | None], limit: int | None
+) -> Iterator[OutputInfo]:
+    found = (out for out in results if out is not None)
+    return found if limit is None else islice(found, limit)
+
+
+def _candidates(
+    index: Searchable, matcher: Matcher
+) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+    """Candidates of index for lines found by `matcher`.
+
+    Matcher of several literal patterns looks up files containing any of
+    them in one pass over the index, so trigram lookup is kept.
+    """
+    literals = matcher.literals
+    if literals is None or len(literals) < 2:
+        return index.candidates(matcher.literal)
+    return index.candidates_any(literals)
+
+
+def _scan_info(
+    matcher: Matcher,
+    needle: Needle | None,
+    file_filter: FileFilter,
+    line_limit: int | None,
+    fpath: str,
+) -> OutputInfo | None:
+    try:
+        lines = scan_lines(fpath, needle, file_filter=file_filter)
+        occurances = _occurances(matcher, lines, line_limit, strip=True)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if len(occurances):
+        return OutputInfo(fpath, occurances)
+    return None
+
+
+def _match_path(matcher: Matcher, path_str: str) -> OutputInfo | None:
+    if spans := matcher.spans(path_str):
+        return OutputInfo(path_str, fpath_spans=spans)
+    return None
+
+
+def _scan_file_info(
+    matcher_file: Matcher,
+    matcher_info: Matcher,
+    needle: Needle | None,
+    file_filter: FileFilter,
+    line_limit: int | None,
+    path_str: str,
+) -> OutputInfo | None:
+    try:
+        lines = scan_lines(path_str, needle, file_filter=file_filter)
+        occs = _occurances(matcher_info, lines, line_limit)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if len(occs) == 0:
+        return None
+
+    return OutputInfo(path_str, occs, matcher_file.spans(path_str))
+
+
+def _fans_out(index: Searchable, options: SearchOptions) -> bool:
+    """Whether shards of `index` are searched by `options.jobs` workers."""
+    return (
+        isinstance(index, ShardedIndex)
+        and options.jobs > 1
+        and len(index.shards) > 1
+    )
+
+
+def _search_shard(
+    search: Callable[..., Iterable[OutputInfo]],
+    args: tuple,
+    options: SearchOptions,
+    shard: Path,
+) -> list[OutputInfo]:
+    from .backends import load_index
+
+    return list(search(*args, load_index(shard), replace(options, jobs=1)))
+
+
+def _search_shards(
+    search: Callable[..., Iterable[OutputInfo]],
+    args: tuple,
+    index: ShardedIndex,
+    options: SearchOptions,
+) -> Iterator[OutputInfo]:
+    """Search every shard of `index` in worker process and merge results.
+
+    Results are merged in order of shards, or as shards are finished if
+    results are not ordered.
+    """
+    search_shard = partial(_search_shard, search, args, options)
+    jobs = min(options.jobs, len(index.shards))
+    for results in parallel_map(search_shard, index.shards, jobs, options.ordered, 1):
+        yield from results
 
-    @staticmethod
-    def search_index_db(info: str, index: IndexDB):
-        data = defaultdict(list)
-        info = clean_regex(info)
 
-        pattern = re.compile(f"{info}")
+class SearchInfoEngine(SearchEngine):
+    @staticmethod
+    def search_index(
+        information: str | Sequence[str],
+        index: Searchable,
+        options: SearchOptions = SearchOptions(),
+    ) -> Iterator[OutputInfo]:
+        matcher = make_matcher(information, options.regex)
+        if _fans_out(index, options):
+            shards = _search_shards(
+                SearchInfoEngine.search_index, (information,), index, options
+            )
+            yield from _limit(shards, options.limit)
+            return
 
-        for item in index.select_information(info):
-            data[item[0]].append((item[1], item[2]))
+        def search() -> Iterator[OutputInfo]:
+            for fpath, lines in _candidates(index, matcher):
+                if not options.file_filter.accepts_name(fpath):
+                    continue
+                occurances = _occurances(
+                    matcher, lines, options.line_limit, strip=True
+                )
+                if len(occurances) > 0:
+                    yield OutputInfo(fpath, occurances)
 
-        for fpath, lines in data.items():
-            occs: dict[int, Occurance] = {}
-            for line, i in lines:
-                occs[i] = Occurance(line, [m.span() for m in pattern.finditer(line)])
-            yield OutputInfo(fpath, occs)
+        yield from _limit(search(), options.limit)
 
     @staticmethod
-    def search_runtime(information: str, root: Path) -> Iterator[OutputInfo]:
+    def search_runtime(
+        information: str | Sequence[str],
+        root: Path,
+        options: SearchOptions = SearchOptions(),
+    ) -> Iterator[OutputInfo]:
         if not root.is_dir():
             raise CLIIndexerException(f"{root} not a dir")
 
-        information = clean_regex(information)
-        pattern = re.compile(f"{information}")
+        matcher = make_matcher(information, options.regex)
+        needle = matcher.needle
 
-        for fpath in walk_files(root):
-            occurances = {}
-            with fpath.open("r", encoding="utf-8") as f:
-                try:
-                    lines = f.readlines()
-                except Exception:
-                    continue
-
-                for i, line in enumerate(lines, start=1):
-                    if pattern.search(line) is None:
-                        continue
-
-                    spans = [m.span() for m in pattern.finditer(line)]
-                    occurances[i] = Occurance(line.rstrip(), spans)
-            if len(occurances):
-                yield OutputInfo(str(fpath), occurances)
+        scan = partial(
+            _scan_info, matcher, needle, options.file_filter, options.line_limit
+        )
+        paths = timed_walk(
+            walk_files(root, options.file_filter, options.jobs), options.jobs
+        )
+        results = parallel_map(scan, paths, options.jobs, options.ordered)
+        yield from _limit(results, options.limit)
 
 
 class SearchFileDirEngine(SearchEngine):
     @staticmethod
-    def search_index(name_part: str, index: Index) -> Iterator[OutputInfo]:
-        name_part = clean_regex(name_part)
-        pattern: re.Pattern = re.compile(f"{name_part}")
-
-        for k in index.keys():
-            if pattern.search(k) is None:
-                continue
+    def search_index(
+        name_part: str, index: Searchable, options: SearchOptions = SearchOptions()
+    ) -> Iterator[OutputInfo]:
+        matcher = make_matcher(name_part, options.regex)
+        if _fans_out(index, options):
+            shards = _search_shards(
+                SearchFileDirEngine.search_index, (name_part,), index, options
+            )
+            yield from _limit(shards, options.limit)
+            return
 
-            spans = [m.span() for m in pattern.finditer(k)]
+        def search() -> Iterator[OutputInfo]:
+            for k in index.path_candidates(matcher.literal):
+                if not options.file_filter.accepts_name(k):
+                    continue
+                if spans := matcher.spans(k):
+                    yield OutputInfo(k, fpath_spans=spans)
 
-            yield OutputInfo(k, dict(), spans)
+        yield from _limit(search(), options.limit)
 
     @staticmethod
-    def search_runtime(name_part: str, root: Path) -> Iterator[OutputInfo]:
+    def search_runtime(
+        name_part: str, root: Path, options: SearchOptions = SearchOptions()
+    ) -> Iterator[OutputInfo]:
         if not root.is_dir():
             raise CLIIndexerException(f"{root} not a dir")
-        name_part = clean_regex(name_part)
-        pattern: re.Pattern = re.compile(f"{name_part}")
-
-        for path in walk(root):
-            path_str = str(path)
-            if pattern.search(path_str) is None:
-                continue
+        matcher = make_matcher(name_part, options.regex)
 
-            spans = [m.span() for m in pattern.finditer(path_str)]
-
-            yield OutputInfo(path_str, dict(), spans)
+        match = partial(_match_path, matcher)
+        walked = walk(root, file_filter=options.file_filter, threads=options.jobs)
+        paths = timed_walk(walked, options.jobs)
+        results = parallel_map(match, paths, options.jobs, options.ordered, 1024)
+        yield from _limit(results, options.limit)
 
 
 class SearchFileDirInfoEngine(SearchEngine):
     @staticmethod
-    def search_index(name_part: str, inform: str, index: Index) -> Iterator[OutputInfo]:
-        name_part = clean_regex(name_part)
-        inform = clean_regex(inform)
-
-        pattern_file: re.Pattern = re.compile(f"{name_part}")
-        pattern_info: re.Pattern = re.compile(f"{inform}")
+    def search_index(
+        name_part: str,
+        inform: str | Sequence[str],
+        index: Searchable,
+        options: SearchOptions = SearchOptions(),
+    ) -> Iterator[OutputInfo]:
+        matcher_file = make_matcher(name_part, options.regex)
+        matcher_info = make_matcher(inform, options.regex)
+        if _fans_out(index, options):
+            shards = _search_shards(
+                SearchFileDirInfoEngine.search_index,
+                (name_part, inform),
+                index,
+                options,
+            )
+            yield from _limit(shards, options.limit)
+            return
 
-        for fpath, lines in index.files():
-            if pattern_file.search(fpath) is None:
-                continue
+        def search() -> Iterator[OutputInfo]:
+            for fpath, lines in _candidates(index, matcher_info):
+                if not (fpath_spans := matcher_file.spans(fpath)):
+                    continue
+                if not options.file_filter.accepts_name(fpath):
+                    continue
 
-            occs: dict[int, Occurance] = {}
-            for i, line in enumerate(lines, start=1):
-                if pattern_info.search(line) is None:
+                occs = _occurances(matcher_info, lines, options.line_limit)
+                if len(occs) == 0:
                     continue
-                occs[i] = Occurance(
-                    line, [m.span() for m in pattern_info.finditer(line)]
-                )
 
-            if len(occs) == 0:
-                continue
+                yield OutputInfo(fpath, occs, fpath_spans)
 
-            yield OutputInfo(
-                fpath, occs, [m.span() for m in pattern_file.finditer(fpath)]
-            )
+        yield from _limit(search(), options.limit)
 
     @staticmethod
-    def search_runtime(name_part: str, inform: str, root: Path) -> Iterator[OutputInfo]:
+    def search_runtime(
+        name_part: str,
+        inform: str | Sequence[str],
+        root: Path,
+        options: SearchOptions = SearchOptions(),
+    ) -> Iterator[OutputInfo]:
         if not root.is_dir():
             raise CLIIndexerException(f"{root} not a dir")
-        name_part = clean_regex(name_part)
-        inform = clean_regex(inform)
-
-        pattern_file: re.Pattern = re.compile(f"{name_part}")
-        pattern_info: re.Pattern = re.compile(f"{inform}")
-
-        for path in walk_files(root):
-            path_str = str(path)
-            if pattern_file.search(path_str) is None:
-                continue
-
-            occs: dict[int, Occurance] = {}
-            try:
-                lines = path.read_text().splitlines()
-            except Exception:
-                continue
-
-            for i, line in enumerate(lines, start=1):
-                if pattern_info.search(line) is None:
-                    continue
-                occs[i] = Occurance(
-                    line, [m.span() for m in pattern_info.finditer(line)]
-                )
-
-            if len(occs) == 0:
-                continue
-
-            yield OutputInfo(
-                path_str, occs, [m.span() for m in pattern_file.finditer(path_str)]
-            )
+        matcher_file = make_matcher(name_part, options.regex)
+        matcher_info = make_matcher(inform, options.regex)
+        needle = matcher_info.needle
+
+        scan = partial(
+            _scan_file_info,
+            matcher_file,
+            matcher_info,
+            needle,
+            options.file_filter,
+            options.line_limit,
+        )
+        walked = walk_files(root, options.file_filter, options.jobs)
+        paths = (
+            path_str
+            for path_str in timed_walk(walked, options.jobs)
+            if matcher_file.spans(path_str)
+        )
+        results = parallel_map(scan, paths, options.jobs, options.ordered)
+        yield from _limit(results, options.limit)
@@ -1,46 +1,145 @@
-from datetime import datetime
-from pathlib import Path
-from .exceptions import CLIIndexerException
-import pickle
-from typing import Generator, Callable, Iterator
+from array import array
+from typing import Callable, Iterator
 from .colors import red_text, blue_text, green_text
+from .context import Context
 from dataclasses import dataclass, field
+from .filters import FileFilter
 
 
-def color_text(
-    text: str, color_fn: Callable[[str], str], spans: list[tuple[int, int]]
-) -> str:
-    output = ""
-    start = 0
-    for occ in spans:
-        output += text[start : occ[0]] + color_fn(text[occ[0] : occ[1]])
-        start = occ[1]
+def no_spans() -> array:
+    return array("I")
 
-    output += text[start:]
 
-    return output
+def span_pairs(spans: array) -> list[tuple[int, int]]:
+    """Pairs of (start, end) stored flat in `spans`."""
+    return list(zip(spans[::2], spans[1::2]))
 
 
-@dataclass(frozen=True)
+def color_text(text: str, color_fn: Callable[[str], str], spans: array) -> str:
+    """Color parts of `text` between flat (start, end) positions of `spans`."""
+    if not spans or not Context.colors:
+        return text
+
+    parts = []
+    start = 0
+    for i in range(0, len(spans), 2):
+        parts.append(text[start : spans[i]])
+        parts.append(color_fn(text[spans[i] : spans[i + 1]]))
+        start = spans[i + 1]
+    parts.append(text[start:])
+
+    return "".join(parts)
+
+
+@dataclass(frozen=True, slots=True)
 class Occurance:
     line: str
-    indexes: list[tuple[int, int]]
+    indexes: array
+    patterns: tuple[str, ...] = ()
 
     def format(self) -> str:
         return color_text(self.line, red_text, self.indexes)
 
+    def format_patterns(self) -> str:
+        if not self.patterns:
+            return ""
+        return " [" + ", ".join(self.patterns) + "]"
+
+    def as_dict(self, line_num: int) -> dict:
+        return {
+            "line": line_num,
+            "text": self.line,
+            "spans": span_pairs(self.indexes),
+            "patterns": self.patterns,
+        }
+
+
+class Occurances:
+    """Matching lines of one file kept in parallel arrays.
+
+    Spans of all lines share one flat array of (start, end) positions,
+    `_ends` holds the end of every line's part of it.
+    """
+
+    __slots__ = ("line_nums", "lines", "patterns", "_spans", "_ends")
 
-@dataclass
+    def __init__(self):
+        self.line_nums = array("I")
+        self.lines: list[str] = []
+        self.patterns: list[tuple[str, ...]] = []
+        self._spans = array("I")
+        self._ends = array("I")
+
+    def add(
+        self, line_num: int, line: str, spans: array, patterns: tuple[str, ...] = ()
+    ):
+        self.line_nums.append(line_num)
+        self.lines.append(line)
+        self.patterns.append(patterns)
+        self._spans.extend(spans)
+        self._ends.append(len(self._spans))
+
+    def spans(self, i: int) -> array:
+        return self._spans[self._ends[i - 1] if i else 0 : self._ends[i]]
+
+    def __len__(self) -> int:
+        return len(self.line_nums)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Occurances):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def items(self) -> Iterator[tuple[int, Occurance]]:
+        """Line numbers with views of their matches."""
+        for i, line_num in enumerate(self.line_nums):
+            yield line_num, Occurance(self.lines[i], self.spans(i), self.patterns[i])
+
+
+@dataclass(slots=True)
 class OutputInfo:
     fpath: str
-    occurances: dict[int, Occurance]
-    fpath_spans: list[tuple[int, int]] = field(default_factory=list)
+    occurances: Occurances = field(default_factory=Occurances)
+    fpath_spans: array = field(default_factory=no_spans)
 
     def format_fpath(self):
         return color_text(self.fpath, green_text, self.fpath_spans)
 
+    def as_dict(self) -> dict:
+        """Plain data of result, ready for `json.dumps`."""
+        return {
+            "path": self.fpath,
+            "path_spans": span_pairs(self.fpath_spans),
+            "lines": [occ.as_dict(num) for num, occ in self.occurances.items()],
+        }
+
     def format(self) -> str:
-        output = green_text("Path: ") + self.format_fpath() + "\n"
+        parts = [green_text("Path: "), self.format_fpath(), "\n"]
         for line_num, occ in self.occurances.items():
-            output += f"\t{blue_text(f'Line {line_num}')}: {occ.format()}\n"
-        return output
+            parts += (
+                "\t",
+                blue_text(f"Line {line_num}"),
+                occ.format_patterns(),
+                ": ",
+                occ.format(),
+                "\n",
+            )
+        return "".join(parts)
+
+
+@dataclass(frozen=True)
+class SearchOptions:
+    jobs: int = 1
+    ordered: bool = True
+    file_filter: FileFilter = FileFilter()
+    regex: bool = False
+    files_only: bool = False
+    max_count: int | None = None
+    limit: int | None = None
+
+    @property
+    def line_limit(self) -> int | None:
+        """Number of matching lines after which reading of file stops."""
+        return 1 if self.files_only else self.max_count
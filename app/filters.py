@@ -0,0 +1,100 @@
+import os
+from dataclasses import dataclass
+from .exceptions import CLIIndexerException
+
+SNIFF_SIZE = 8192
+# only signatures that text cannot start with, printable ones such as `MZ`
+# or `%PDF` would skip text files starting with the same letters
+BINARY_MAGIC = (
+    b"\x7fELF",
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+    b"PK\x03\x04",
+    b"\x1f\x8b",
+    b"\xfd7zXZ",
+    b"7z\xbc\xaf",
+    b"\xca\xfe\xba\xbe",
+    b"\xcf\xfa\xed\xfe",
+)
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def extension(name: str) -> str:
+    return os.path.splitext(name)[1].lstrip(".").lower()
+
+
+def parse_size(value: str) -> int:
+    """Parse size such as `512`, `64K`, `10M` or `1G` to number of bytes."""
+    number, unit = value.rstrip("KMGkmg"), value[len(value.rstrip("KMGkmg")) :]
+    if not number.isdigit() or len(unit) > 1:
+        raise CLIIndexerException(f"invalid size: {value}")
+    return int(number) * SIZE_UNITS[unit.upper()]
+
+
+def parse_extensions(value: str) -> frozenset[str]:
+    """Parse comma separated list of extensions, leading dots are optional.
+
+    Raises:
+        CLIIndexerException: raised if list contains no extension
+    """
+    extensions = frozenset(
+        ext
+        for ext in (part.strip().lstrip(".").lower() for part in value.split(","))
+        if ext
+    )
+    if not extensions:
+        raise CLIIndexerException(f"invalid list of extensions: {value!r}")
+    return extensions
+
+
+@dataclass(frozen=True)
+class FileFilter:
+    """Decides which files are read while indexing and searching.
+
+    Ignore files, name and size are checked by walkers, before file is opened.
+    Content is sniffed for binary data on the first read block.
+    """
+
+    max_size: int | None = None
+    extensions: frozenset[str] | None = None
+    excluded_extensions: frozenset[str] = frozenset()
+    skip_binary: bool = True
+    ignore_files: bool = True
+    follow_links: bool = False
+
+    def accepts_name(self, name: str) -> bool:
+        if self.extensions is None and not self.excluded_extensions:
+            return True
+        ext = extension(name)
+        if self.extensions is not None and ext not in self.extensions:
+            return False
+        return ext not in self.excluded_extensions
+
+    def accepts_size(self, size: int) -> bool:
+        return self.max_size is None or size <= self.max_size
+
+    def accepts_entry(self, entry: os.DirEntry) -> bool:
+        if not self.accepts_name(entry.name):
+            return False
+        if self.max_size is None:
+            return True
+        try:
+            return self.accepts_size(entry.stat().st_size)
+        except OSError:
+            return False
+
+    def accepts(self, fpath: str) -> bool:
+        if not self.accepts_name(fpath):
+            return False
+        if self.max_size is None:
+            return True
+        try:
+            return self.accepts_size(os.stat(fpath).st_size)
+        except OSError:
+            return False
+
+    def is_binary(self, head: bytes) -> bool:
+        """Check whether first block of file looks like binary data."""
+        if not self.skip_binary:
+            return False
+        return b"\0" in head[:SNIFF_SIZE] or head.startswith(BINARY_MAGIC)
@@ -0,0 +1,123 @@
+import os
+import re
+from typing import Iterable
+
+IGNORE_FILES = (".gitignore", ".ignore")
+ALWAYS_IGNORED = frozenset({".git", ".hg", ".svn"})
+
+
+def _translate(pattern: str) -> str:
+    """Translate gitignore glob to regex matching path relative to its base."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        at_start = i == 0 or pattern[i - 1] == "/"
+        if at_start and pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif at_start and pattern.startswith("**", i) and i + 2 == n:
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[" and (j := pattern.find("]", i + 2)) != -1:
+            body = pattern[i + 1 : j].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def parse_rule(line: str) -> tuple[re.Pattern, bool, bool] | None:
+    """Parse line of ignore file.
+
+    Returns:
+        tuple of compiled pattern, negation flag and directory only flag,
+        None for blank lines and comments
+    """
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    anchored = "/" in line
+    regex = ("" if anchored else "(?:.*/)?") + _translate(line.lstrip("/"))
+    return re.compile(regex, re.DOTALL), negated, dir_only
+
+
+class IgnoreRules:
+    """Rules of ignore files found in one directory, chained to rules of parents.
+
+    Rules are evaluated from the deepest directory up, within one directory
+    the last matching rule wins, as in git.
+    """
+
+    def __init__(
+        self,
+        base: str,
+        rules: list[tuple[re.Pattern, bool, bool]],
+        parent: "IgnoreRules | None" = None,
+    ):
+        self.base = base
+        self.rules = rules[::-1]
+        self.parent = parent
+
+    @staticmethod
+    def load(
+        dir_path: str,
+        parent: "IgnoreRules | None",
+        names: Iterable[str] = IGNORE_FILES,
+    ) -> "IgnoreRules | None":
+        """Read ignore files `names` of `dir_path`, `parent` if there are none."""
+        rules = []
+        for name in names:
+            try:
+                with open(os.path.join(dir_path, name), encoding="utf-8") as f:
+                    rules.extend(r for r in map(parse_rule, f) if r is not None)
+            except (OSError, UnicodeDecodeError):
+                continue
+
+        if not rules:
+            return parent
+        return IgnoreRules(dir_path, rules, parent)
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        """Decide whether `path` located under `base` is ignored."""
+        node: IgnoreRules | None = self
+        while node is not None:
+            relative = path[len(node.base) :].lstrip(os.sep)
+            if os.sep != "/":
+                relative = relative.replace(os.sep, "/")
+
+            for pattern, negated, dir_only in node.rules:
+                if dir_only and not is_dir:
+                    continue
+                if pattern.fullmatch(relative):
+                    return not negated
+            node = node.parent
+        return False
@@ -1,49 +1,126 @@
 import sqlite3
 from pathlib import Path
 import pickle
-from typing import Generator, Iterator
+from typing import Generator, Iterable, Iterator, Sequence
 from .exceptions import CLIIndexerException
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+import os
+from .paths import PathTable
+from .trigram import TRIGRAM_SIZE, trigrams
+
+
+def _phrase(literal: str) -> str:
+    """Full text query phrase matching `literal` as is."""
+    return '"' + literal.replace('"', '""') + '"'
 
 
 class IndexDB:
-    def __init__(self, db_name: Path):
-        if db_name.suffix not in {".db", ".sqlite"}:
+    """Index stored in sqlite database.
+
+    Lines are stored in FTS5 table with trigram tokenizer, so searching
+    information of 3 or more characters uses full text index instead of
+    scanning all lines. Paths have their own trigram table for `searchfd`.
+    Database is not loaded to memory.
+    """
+
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL;",
+        "PRAGMA synchronous = OFF;",
+    )
+    READ_PRAGMAS = (
+        "PRAGMA temp_store = MEMORY;",
+        "PRAGMA cache_size = -65536;",
+        "PRAGMA mmap_size = 268435456;",
+    )
+    TABLES = frozenset(("meta", "paths", "lines"))
+    NEW_TABLES = frozenset(("path_trigrams",))
+    """Tables missing in indexes of older versions."""
+
+    def __init__(self, db_name: Path, read_only: bool = False):
+        """Open index database, created with its tables unless `read_only`.
+
+        Raises:
+            CLIIndexerException: raised if suffix is not supported, or read
+                only database is not an index
+        """
+        if not self.valid_db(db_name):
             raise CLIIndexerException(f"expected {db_name} to be .db or .sqlite file")
 
-        self.connection = sqlite3.connect(db_name)
+        self.dst = db_name
+        if read_only:
+            # database is never modified, even if it is not an index
+            uri = db_name.resolve().as_uri() + "?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True, isolation_level=None)
+        else:
+            self.connection = sqlite3.connect(db_name, isolation_level=None)
         self.cursor = self.connection.cursor()
 
-        self.create_tables()
+        pragmas = self.READ_PRAGMAS if read_only else self.PRAGMAS + self.READ_PRAGMAS
+        for pragma in pragmas:
+            self.cursor.execute(pragma)
+
+        if read_only:
+            self.check_tables()
+        else:
+            self.create_tables()
+            self.cursor.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('created', ?)",
+                (datetime.now().strftime(r"%d.%m.%Y %H:%M:%S"),),
+            )
+        row = self.cursor.execute(
+            "SELECT value FROM meta WHERE key = 'created'"
+        ).fetchone()
+        if row is None:
+            raise CLIIndexerException(f"Cannot load `{db_name}`, may be damaged.")
+        self.created: str = row[0]
+
+    def check_tables(self):
+        query = "SELECT name FROM sqlite_master WHERE type = 'table'"
+        tables = {name for (name,) in self.cursor.execute(query)}
+        if not self.TABLES <= tables:
+            raise CLIIndexerException(f"Cannot load `{self.dst}`, may be damaged.")
+        if not self.NEW_TABLES <= tables:
+            raise CLIIndexerException(
+                f"Index `{self.dst}` was created by other version, create it again."
+            )
 
     def create_tables(self):
-        self.cursor.execute("PRAGMA foreign_keys = ON;")
+        self.cursor.execute(
+            """CREATE TABLE IF NOT EXISTS meta (
+                            key TEXT PRIMARY KEY,
+                            value TEXT NOT NULL
+        );"""
+        )
         self.cursor.execute(
             """CREATE TABLE IF NOT EXISTS paths (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            id INTEGER PRIMARY KEY,
                             path TEXT NOT NULL UNIQUE
         );"""
         )
         self.cursor.execute(
-            """CREATE TABLE IF NOT EXISTS lines (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            line TEXT NOT NULL,
-                            path_id INTEGER NOT NULL,
-                            line_n INTEGER NOT NULL,
-                            FOREIGN KEY (path_id) REFERENCES paths (id)
+            """CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+                            line,
+                            path_id UNINDEXED,
+                            line_n UNINDEXED,
+                            tokenize = 'trigram case_sensitive 1'
         );"""
         )
-
-    def select_information(self, information: str) -> list[tuple[str, str, int]]:
+        # indexes text of paths table without storing it again
         self.cursor.execute(
-            f"""SELECT paths.path, lines.line, lines.line_n 
-            FROM lines JOIN paths ON paths.id=lines.path_id 
-            WHERE lines.line LIKE '%{information}%'"""
+            """CREATE VIRTUAL TABLE IF NOT EXISTS path_trigrams USING fts5(
+                            path,
+                            content = 'paths',
+                            content_rowid = 'id',
+                            tokenize = 'trigram case_sensitive 1'
+        );"""
         )
 
-        return self.cursor.fetchall()
-
     def insert(self, path: str, lines: list[str]):
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN;")
+
         self.cursor.execute("INSERT INTO paths (path) VALUES (?)", (path,))
         path_id = self.cursor.lastrowid
         self.cursor.executemany(
@@ -51,49 +128,265 @@ class IndexDB:
             ((line, path_id, i) for i, line in enumerate(lines, start=1)),
         )
 
+    def dump(self):
+        if self.connection.in_transaction:
+            self.cursor.execute("COMMIT;")
+        self.cursor.execute("INSERT INTO lines (lines) VALUES ('optimize');")
+        self.cursor.execute(
+            "INSERT INTO path_trigrams (path_trigrams) VALUES ('rebuild');"
+        )
+        self.cursor.execute("PRAGMA optimize;")
+        # WAL is needed only while filling, read only connections of finished
+        # index would leave -wal and -shm files behind
+        self.cursor.execute("PRAGMA journal_mode = DELETE;")
+        self.close()
+
+    def close(self):
+        # cursor holds statements of pragmas, they would keep database locked
+        self.cursor.close()
+        self.connection.close()
+
+    def keys(self) -> Iterator[str]:
+        for (path,) in self.connection.execute("SELECT path FROM paths ORDER BY id"):
+            yield path
+
+    def path_candidates(self, literal: str | None) -> Iterator[str]:
+        """Yield paths that may contain `literal`.
+
+        Literal of 3 or more characters is matched by trigram table of paths,
+        shorter one by scanning paths inside database.
+        """
+        if not literal:
+            yield from self.keys()
+            return
+        if len(literal) < TRIGRAM_SIZE:
+            query = "SELECT path FROM paths WHERE instr(path, ?) > 0 ORDER BY id"
+            params = (literal,)
+        else:
+            query = """SELECT path FROM path_trigrams
+                WHERE path_trigrams MATCH ? ORDER BY rowid"""
+            params = (_phrase(literal),)
+        for (path,) in self.connection.execute(query, params):
+            yield path
+
+    def files(self) -> Generator[tuple[str, list[str]], None, None]:
+        for fpath, lines in self.candidates(None):
+            yield fpath, [line for _, line in lines]
+
+    def candidates(
+        self, literal: str | None
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        """Yield numbered lines of files that may contain `literal`.
+
+        Information of 3 or more characters is matched by full text index,
+        shorter one by scanning lines inside database.
+        """
+        if not literal:
+            return self._select("", ())
+        if len(literal) < TRIGRAM_SIZE:
+            return self._select("instr(lines.line, ?) > 0", (literal,))
+        return self._select("lines MATCH ?", (_phrase(literal),))
+
+    def candidates_any(
+        self, literals: Sequence[str]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        """Yield numbered lines of files that may contain any of `literals`.
+
+        Literals are joined by OR into one full text query, lines are scanned
+        inside database if some literal is shorter than 3 characters.
+        """
+        if any(len(literal) < TRIGRAM_SIZE for literal in literals):
+            where = " OR ".join("instr(lines.line, ?) > 0" for _ in literals)
+            return self._select(where, tuple(literals))
+        return self._select("lines MATCH ?", (" OR ".join(map(_phrase, literals)),))
+
+    def _select(
+        self, where: str, params: tuple[str, ...]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        query = """SELECT paths.path, lines.line_n, lines.line
+            FROM lines JOIN paths ON paths.id = lines.path_id"""
+        if where:
+            query += f" WHERE {where}"
+        query += " ORDER BY lines.rowid"
+
+        rows = self.connection.execute(query, params)
+        for fpath, group in groupby(rows, key=itemgetter(0)):
+            yield fpath, [(line_n, line) for _, line_n, line in group]
+
     def __del__(self):
         try:
-            self.connection.commit()
-            del self.cursor
             self.connection.close()
         except Exception:
             pass
 
+    @staticmethod
+    def valid_db(fpath: Path):
+        return fpath.suffix in {".db", ".sqlite"}
+
+    @staticmethod
+    def load(fpath: Path) -> "IndexDB":
+        if not fpath.is_file():
+            raise CLIIndexerException(f"No such file {fpath}")
+        try:
+            return IndexDB(fpath, read_only=True)
+        except sqlite3.DatabaseError:
+            raise CLIIndexerException(f"Cannot load `{fpath}`, may be damaged.")
+
 
 class Index:
+    FORMAT_VERSION = 4
+
     def __init__(self, dst: Path):
         if not self.valid_pkl(dst):
             raise CLIIndexerException(f"Expected {dst} to be .pkl file")
 
+        self.version: int = self.FORMAT_VERSION
         self.created: str = datetime.now().strftime(r"%d.%m.%Y %H:%M:%S")
-        self._d: dict[str, list[str] | None] = {}
+        self._paths = PathTable()
+        self._d: dict[int, list[str] | None] = {}
+        self._trigrams: dict[str, set[int]] = {}
+        self._signatures: dict[int, tuple[int, int, int]] = {}
         self.dst = dst
 
     def insert(self, path: str, lines: list[str]):
+        path_id = self._paths.add(path)
+        if path_id in self._d:
+            self._discard_trigrams(path_id)
+
         if not lines:
-            self._d[path] = None
-        else:
-            self._d[path] = lines
+            self._d[path_id] = None
+            return
+
+        self._d[path_id] = lines
+
+        for gram in trigrams("\n".join(lines)):
+            self._trigrams.setdefault(gram, set()).add(path_id)
+
+    def remove(self, path: str):
+        if (path_id := self._paths.find(path)) is None:
+            return
+        self._discard_trigrams(path_id)
+        self._d.pop(path_id, None)
+        self._signatures.pop(path_id, None)
+
+    def _discard_trigrams(self, path_id: int):
+        if not (lines := self._d.get(path_id)):
+            return
+        for gram in trigrams("\n".join(lines)):
+            posting = self._trigrams[gram]
+            posting.discard(path_id)
+            if not posting:
+                del self._trigrams[gram]
+
+    def _compact(self):
+        """Drop path nodes of removed files, so churning files do not grow table."""
+        moved = self._paths.compact(self._d.keys() | self._signatures.keys())
+        if moved is None:
+            return
+        self._d = {moved[k]: v for k, v in self._d.items()}
+        self._signatures = {moved[k]: v for k, v in self._signatures.items()}
+        self._trigrams = {
+            gram: {moved[k] for k in posting}
+            for gram, posting in self._trigrams.items()
+        }
+
+    def signature(self, path: str) -> tuple[int, int, int] | None:
+        if (path_id := self._paths.find(path)) is None:
+            return None
+        return self._signatures.get(path_id)
+
+    def set_signature(self, path: str, signature: tuple[int, int, int]):
+        self._signatures[self._paths.add(path)] = signature
+
+    def signed_paths(self) -> Iterator[str]:
+        return self._paths.paths(self._signatures.keys())
 
     def dump(self):
         if self._d is None:
             raise CLIIndexerException("Empty data, nothing to dump.")
-        with self.dst.open("wb") as f:
+        self._compact()
+        # replaced at once, so readers never see partially written index
+        tmp = self.dst.with_name(self.dst.name + ".tmp")
+        with tmp.open("wb") as f:
             pickle.dump(self, f)
+        os.replace(tmp, self.dst)
 
     def files(self) -> Generator[tuple[str, list[str]], None, None]:
-        for k, v in self._d.items():
-            if v is None:
-                continue
-            yield (k, v)
+        ids = [k for k, v in self._d.items() if v is not None]
+        for fpath, path_id in zip(self._paths.paths(ids), ids):
+            yield (fpath, self._d[path_id])  # type: ignore[misc]
 
     def items(self) -> Generator[tuple[str, list[str] | None], None, None]:
-        for item in self._d.items():
-            yield item
+        for fpath, lines in zip(self._paths.paths(self._d.keys()), self._d.values()):
+            yield fpath, lines
 
     def keys(self) -> Iterator[str]:
-        for k in self._d.keys():
-            yield k
+        return self._paths.paths(self._d.keys())
+
+    def path_candidates(self, literal: str | None) -> Iterator[str]:
+        """Yield paths that may contain `literal`.
+
+        Literal without path separator is looked up in index of path
+        components, otherwise all paths are yielded.
+        """
+        if not literal or os.sep in literal:
+            return self.keys()
+        found = self._paths.containing(literal)
+        return self._paths.paths(sorted(k for k in found if k in self._d))
+
+    def candidates(
+        self, literal: str | None
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        """Yield numbered lines of files that may contain `literal`.
+
+        Files are narrowed down by intersecting trigram posting lists, so the
+        result is a superset of real matches and must be verified by caller.
+        If `literal` is None or too short to use trigrams, all files are yielded.
+
+        Args:
+            literal (str | None): text that has to occur in a file
+
+        Yields:
+            tuple of file path and iterable of (line number, line)
+        """
+        if literal is None or len(literal) < TRIGRAM_SIZE:
+            return self._all_lines()
+        return self._lines_of(self._lookup(literal))
+
+    def candidates_any(
+        self, literals: Sequence[str]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        """Yield numbered lines of files that may contain any of `literals`.
+
+        Union of files found for every literal like by `candidates()` is
+        yielded in index order, all files if some literal is too short.
+        """
+        if any(len(literal) < TRIGRAM_SIZE for literal in literals):
+            return self._all_lines()
+        return self._lines_of(set().union(*map(self._lookup, literals)))
+
+    def _lookup(self, literal: str) -> set[int]:
+        """Ids of files holding every trigram of `literal`."""
+        postings = sorted(
+            (self._trigrams.get(gram, set()) for gram in trigrams(literal)), key=len
+        )
+        ids = set(postings[0])
+        for posting in postings[1:]:
+            ids &= posting
+            if not ids:
+                break
+        return ids
+
+    def _all_lines(self) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        for fpath, lines in self.files():
+            yield fpath, enumerate(lines, start=1)
+
+    def _lines_of(
+        self, ids: set[int]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        ids_sorted = sorted(ids)
+        for fpath, path_id in zip(self._paths.paths(ids_sorted), ids_sorted):
+            yield fpath, enumerate(self._d[path_id] or [], start=1)
 
     @staticmethod
     def valid_pkl(fpath: Path):
@@ -113,4 +406,8 @@ class Index:
             raise CLIIndexerException(
                 f"Wrong object of type {obj.__class__.__name__} (expected {Index.__name__})"
             )
+        if getattr(obj, "version", 1) != Index.FORMAT_VERSION:
+            raise CLIIndexerException(
+                f"Index `{fpath}` was created by other version, create it again."
+            )
         return obj
@@ -1,4 +1,4 @@
-from typing import Protocol, Any
+from typing import Protocol, Any, Iterable, Iterator, Sequence
 from abc import ABC, abstractmethod
 
 
@@ -7,6 +7,40 @@ class Insertable(Protocol):
         ...
 
 
+class Updatable(Insertable, Protocol):
+    def signature(self, path: str) -> tuple[int, int, int] | None:
+        ...
+
+    def set_signature(self, path: str, signature: tuple[int, int, int]) -> None:
+        ...
+
+    def signed_paths(self) -> Iterator[str]:
+        ...
+
+    def remove(self, path: str) -> None:
+        ...
+
+
+class Searchable(Protocol):
+    created: str
+
+    def keys(self) -> Iterator[str]:
+        ...
+
+    def path_candidates(self, literal: str | None) -> Iterator[str]:
+        ...
+
+    def candidates(
+        self, literal: str | None
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        ...
+
+    def candidates_any(
+        self, literals: Sequence[str]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        ...
+
+
 class Executable(Protocol):
     @property
     def name(self) -> str:
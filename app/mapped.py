@@ -0,0 +1,539 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from heapq import merge
+from itertools import accumulate, groupby, islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Generator, Iterable, Iterator, Sequence
+from .exceptions import CLIIndexerException
+from .stats import count
+from .trigram import TRIGRAM_SIZE, trigrams
+
+MAGIC = b"CLIIDX\x00\x00"
+FORMAT_VERSION = 3
+ALIGNMENT = 8
+GRAM_WIDTH = 4 * TRIGRAM_SIZE
+COMPRESSIONS = ("zlib", "lzma")
+BLOCK_SIZE = 1 << 16
+"""Uncompressed size after which block of compressed lines is closed."""
+
+SECTIONS = (
+    "meta",
+    "path_offsets",
+    "path_blob",
+    "file_lines",
+    "line_offsets",
+    "line_blob",
+    "block_starts",
+    "block_offsets",
+    "gram_keys",
+    "gram_offsets",
+    "postings",
+    "name_offsets",
+    "name_blob",
+    "name_file_offsets",
+    "name_files",
+    "name_gram_keys",
+    "name_gram_offsets",
+    "name_postings",
+)
+HEADER = struct.Struct("<8sII" + "QQ" * len(SECTIONS))
+
+
+def gram_key(gram: str) -> bytes:
+    return gram.encode("utf-8").ljust(GRAM_WIDTH, b"\0")
+
+
+def _posting_sections(postings: dict[str, array]) -> list[bytes]:
+    """Sorted trigram keys, offsets of their postings and the postings."""
+    grams = sorted((gram_key(gram), posting) for gram, posting in postings.items())
+    offsets = array("Q", accumulate((len(posting) for _, posting in grams), initial=0))
+    joined = array("I")
+    for _, posting in grams:
+        joined.extend(posting)
+    return [b"".join(key for key, _ in grams), offsets.tobytes(), joined.tobytes()]
+
+
+def codec(
+    compression: str,
+) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """Compress and decompress functions of `compression`.
+
+    Raises:
+        CLIIndexerException: raised if compression is not supported
+    """
+    match compression:
+        case "zlib":
+            import zlib
+
+            return zlib.compress, zlib.decompress
+        case "lzma":
+            import lzma
+
+            return lzma.compress, lzma.decompress
+        case _:
+            raise CLIIndexerException(
+                f"Expected compression to be one of {', '.join(COMPRESSIONS)}"
+            )
+
+
+class MappedIndexWriter:
+    """Builds `.idx` index file that is read through `MappedIndex`.
+
+    Layout of the file after fixed size header (all sections are 8 bytes aligned):
+    - meta: json with creation time, byte order and compression
+    - path table: offsets (uint64) into utf-8 blob of paths
+    - file table: (first line, number of lines) pair (uint64) for every path
+    - line offsets: offset (uint64) of every line in line blob
+    - line blob: utf-8 lines, each terminated by newline
+    - block directory: uncompressed start and offset in line blob (uint64)
+      of every block, empty if lines are not compressed
+
+    Compressed line blob consists of independently compressed blocks of
+    whole files, so reading lines of a file decompresses just one block.
+    - trigram keys: sorted utf-8 trigrams padded to fixed width
+    - trigram postings: offsets (uint64) into sorted path ids (uint32)
+    - name table: offsets (uint64) into utf-8 blob of distinct path components
+    - name files: offsets (uint64) into sorted ids (uint32) of paths
+      holding the component
+    - name trigrams: keys and postings of name ids, same as trigrams of lines
+    """
+
+    def __init__(
+        self, dst: Path, compression: str | None = None, block_size: int = BLOCK_SIZE
+    ):
+        if not self.valid_idx(dst):
+            raise CLIIndexerException(f"Expected {dst} to be .idx file")
+
+        self.created: str = datetime.now().strftime(r"%d.%m.%Y %H:%M:%S")
+        self.dst = dst
+        self._paths: list[str] = []
+        self._file_lines = array("Q")
+        self._line_offsets = array("Q", [0])
+        self._trigrams: dict[str, array] = {}
+        self._names: dict[str, int] = {}
+        self._name_files: list[array] = []
+        self._blob = tempfile.TemporaryFile()
+
+        self.compression = compression
+        self.block_size = block_size
+        self._compress = None if compression is None else codec(compression)[0]
+        self._block: list[bytes] = []
+        self._block_size = 0
+        self._block_starts = array("Q", [0])
+        self._block_offsets = array("Q", [0])
+
+    def insert(self, path: str, lines: list[str]):
+        path_id = len(self._paths)
+        self._paths.append(path)
+        self._file_lines.extend((len(self._line_offsets) - 1, len(lines)))
+        for name in set(path.split(os.sep)) - {""}:
+            name_id = self._names.setdefault(name, len(self._names))
+            if name_id == len(self._name_files):
+                self._name_files.append(array("I"))
+            self._name_files[name_id].append(path_id)
+
+        if not lines:
+            return
+
+        data = [line.encode("utf-8") + b"\n" for line in lines]
+        self._line_offsets.extend(
+            islice(accumulate(map(len, data), initial=self._line_offsets[-1]), 1, None)
+        )
+        self._write_lines(b"".join(data))
+
+        for gram in trigrams("\n".join(lines)):
+            self._trigrams.setdefault(gram, array("I")).append(path_id)
+
+    def _write_lines(self, data: bytes):
+        if self._compress is None:
+            self._blob.write(data)
+            return
+        self._block.append(data)
+        self._block_size += len(data)
+        if self._block_size >= self.block_size:
+            self._close_block()
+
+    def _close_block(self):
+        if not self._block:
+            return
+        self._blob.write(self._compress(b"".join(self._block)))
+        self._block_starts.append(self._line_offsets[-1])
+        self._block_offsets.append(self._blob.tell())
+        self._block.clear()
+        self._block_size = 0
+
+    def dump(self):
+        self._close_block()
+        compressed = self._compress is not None
+        encoded_paths = [path.encode("utf-8") for path in self._paths]
+        path_offsets = array("Q", accumulate(map(len, encoded_paths), initial=0))
+
+        encoded_names = [name.encode("utf-8") for name in self._names]
+        name_offsets = array("Q", accumulate(map(len, encoded_names), initial=0))
+        name_file_offsets = array(
+            "Q", accumulate(map(len, self._name_files), initial=0)
+        )
+        name_files = array("I")
+        name_trigrams: dict[str, array] = {}
+        for name_id, name in enumerate(self._names):
+            name_files.extend(self._name_files[name_id])
+            for gram in trigrams(name):
+                name_trigrams.setdefault(gram, array("I")).append(name_id)
+
+        meta = {
+            "created": self.created,
+            "byteorder": sys.byteorder,
+            "compression": self.compression,
+        }
+
+        sections: list[bytes | None] = [
+            json.dumps(meta).encode("utf-8"),
+            path_offsets.tobytes(),
+            b"".join(encoded_paths),
+            self._file_lines.tobytes(),
+            self._line_offsets.tobytes(),
+            None,
+            self._block_starts.tobytes() if compressed else b"",
+            self._block_offsets.tobytes() if compressed else b"",
+            *_posting_sections(self._trigrams),
+            name_offsets.tobytes(),
+            b"".join(encoded_names),
+            name_file_offsets.tobytes(),
+            name_files.tobytes(),
+            *_posting_sections(name_trigrams),
+        ]
+
+        table: list[int] = []
+        # replaced at once, so readers never see partially written index
+        tmp = self.dst.with_name(self.dst.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(bytes(HEADER.size))
+            for data in sections:
+                f.write(bytes(-f.tell() % ALIGNMENT))
+                start = f.tell()
+                if data is None:
+                    self._blob.seek(0)
+                    while chunk := self._blob.read(1 << 20):
+                        f.write(chunk)
+                else:
+                    f.write(data)
+                table.extend((start, f.tell() - start))
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, *table))
+        os.replace(tmp, self.dst)
+
+        self._blob.close()
+
+    @staticmethod
+    def valid_idx(fpath: Path):
+        return fpath.suffix == ".idx"
+
+
+class _FixedWidth:
+    """Sequence view of fixed width byte records, usable with `bisect`."""
+
+    def __init__(self, view: memoryview, width: int):
+        self.view = view
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.view) // self.width
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.view[i * self.width : (i + 1) * self.width])
+
+
+class _Postings:
+    """Posting lists of trigrams stored in sections of `.idx` file."""
+
+    def __init__(self, keys: memoryview, offsets: memoryview, postings: memoryview):
+        if len(keys) % GRAM_WIDTH:
+            raise ValueError("keys are not of fixed width")
+        self.keys = _FixedWidth(keys, GRAM_WIDTH)
+        self.offsets = offsets.cast("Q")
+        self.postings = postings.cast("I")
+        if len(self.offsets) != len(self.keys) + 1:
+            raise ValueError("every key needs its posting list")
+        if self.offsets[-1] != len(self.postings):
+            raise ValueError("postings do not fit into their section")
+
+    def lookup(self, literal: str) -> list[int]:
+        """Sorted ids holding every trigram of `literal`."""
+        postings = []
+        for gram in trigrams(literal):
+            key = gram_key(gram)
+            i = bisect_left(self.keys, key)
+            if i == len(self.keys) or self.keys[i] != key:
+                return []
+            postings.append(self.postings[self.offsets[i] : self.offsets[i + 1]])
+
+        postings.sort(key=len)
+        ids = set(postings[0])
+        for posting in postings[1:]:
+            ids.intersection_update(posting)
+            if not ids:
+                return []
+        return sorted(ids)
+
+
+class MappedIndex:
+    """Read only index opened through `mmap`.
+
+    Nothing but the header is read on load, pages of the file are loaded by
+    operating system only when a query touches them. Compressed blocks are
+    decompressed only for files found by trigram postings, the last one
+    is kept, since files are visited in order of the file.
+    """
+
+    def __init__(self, fpath: Path):
+        if not fpath.is_file():
+            raise CLIIndexerException(f"No such file {fpath}")
+
+        with fpath.open("rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise CLIIndexerException(f"Cannot load `{fpath}`, may be damaged.")
+
+        try:
+            magic, version, _, *table = HEADER.unpack_from(self._mm)
+        except struct.error:
+            raise CLIIndexerException(f"Cannot load `{fpath}`, may be damaged.")
+        if magic != MAGIC:
+            raise CLIIndexerException(f"Cannot load `{fpath}`, may be damaged.")
+        if version != FORMAT_VERSION:
+            raise CLIIndexerException(
+                f"Index `{fpath}` was created by other version, create it again."
+            )
+
+        self.dst = fpath
+        try:
+            meta = self._open_sections(table)
+        except (ValueError, LookupError, TypeError, struct.error):
+            raise CLIIndexerException(f"Cannot load `{fpath}`, may be damaged.")
+        if meta["byteorder"] != sys.byteorder:
+            raise CLIIndexerException(f"Index `{fpath}` was created on other platform.")
+
+        self._decompress = None
+        if self.compression is not None:
+            self._decompress = codec(self.compression)[1]
+        self._block_id = -1
+        self._block_data = b""
+
+    def _open_sections(self, table: list[int]) -> dict:
+        """Map sections listed in header `table` and check they fit together.
+
+        Returns:
+            dict: meta of index
+
+        Raises:
+            ValueError: raised if sections do not fit into file or each other
+        """
+        size = len(self._mm)
+        view = memoryview(self._mm)
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            start, length = table[2 * i], table[2 * i + 1]
+            if start < HEADER.size or start + length > size:
+                raise ValueError(f"section {name} out of file")
+            sections[name] = view[start : start + length]
+
+        meta = json.loads(bytes(sections["meta"]))
+        self.created: str = meta["created"]
+        self.compression: str | None = meta["compression"]
+        if self.compression is not None and self.compression not in COMPRESSIONS:
+            raise ValueError(f"unknown compression {self.compression}")
+
+        self._blob_start: int = table[2 * SECTIONS.index("line_blob")]
+        self._path_offsets = sections["path_offsets"].cast("Q")
+        self._path_blob = sections["path_blob"]
+        self._file_lines = sections["file_lines"].cast("Q")
+        self._line_offsets = sections["line_offsets"].cast("Q")
+        self._line_blob = sections["line_blob"]
+        self._grams = _Postings(
+            sections["gram_keys"], sections["gram_offsets"], sections["postings"]
+        )
+        self._name_offsets = sections["name_offsets"].cast("Q")
+        self._name_blob = sections["name_blob"]
+        self._name_file_offsets = sections["name_file_offsets"].cast("Q")
+        self._name_files = sections["name_files"].cast("I")
+        self._name_grams = _Postings(
+            sections["name_gram_keys"],
+            sections["name_gram_offsets"],
+            sections["name_postings"],
+        )
+        self._block_starts = sections["block_starts"].cast("Q")
+        self._block_offsets = sections["block_offsets"].cast("Q")
+
+        if self.compression is None:
+            blob_size = len(self._line_blob)
+        else:
+            blob_size = self._block_starts[-1]
+            if self._block_offsets[-1] != len(self._line_blob):
+                raise ValueError("blocks do not cover line blob")
+        if (
+            self._path_offsets[-1] != len(self._path_blob)
+            or len(self._file_lines) != 2 * len(self)
+            or self._line_offsets[-1] != blob_size
+            or self._name_offsets[-1] != len(self._name_blob)
+            or len(self._name_file_offsets) != len(self._name_offsets)
+            or self._name_file_offsets[-1] != len(self._name_files)
+        ):
+            raise ValueError("sections do not fit together")
+        return meta
+
+    def __len__(self) -> int:
+        return len(self._path_offsets) - 1
+
+    def path(self, path_id: int) -> str:
+        start, end = self._path_offsets[path_id], self._path_offsets[path_id + 1]
+        return bytes(self._path_blob[start:end]).decode("utf-8")
+
+    def lines(self, path_id: int) -> list[str] | None:
+        first, count = self._file_lines[2 * path_id], self._file_lines[2 * path_id + 1]
+        if count == 0:
+            return None
+        start, end = self._line_offsets[first], self._line_offsets[first + count]
+        data, base = self._lines_data(first)
+        return data[base + start : base + end].decode("utf-8").split("\n")[:-1]
+
+    def _lines_data(self, first: int) -> tuple[bytes | mmap.mmap, int]:
+        """Data holding lines of file starting with line `first`.
+
+        Returns:
+            tuple[bytes | mmap.mmap, int]: data and position of offset 0 of
+                line offsets in it
+        """
+        if self._decompress is None:
+            return self._mm, self._blob_start
+        block = bisect_right(self._block_starts, self._line_offsets[first]) - 1
+        if block != self._block_id:
+            start, end = self._block_offsets[block], self._block_offsets[block + 1]
+            self._block_data = self._decompress(self._line_blob[start:end])
+            self._block_id = block
+            count("blocks")
+        return self._block_data, -self._block_starts[block]
+
+    def files(self) -> Generator[tuple[str, list[str]], None, None]:
+        for path_id in range(len(self)):
+            if (lines := self.lines(path_id)) is not None:
+                yield self.path(path_id), lines
+
+    def items(self) -> Generator[tuple[str, list[str] | None], None, None]:
+        for path_id in range(len(self)):
+            yield self.path(path_id), self.lines(path_id)
+
+    def keys(self) -> Iterator[str]:
+        for path_id in range(len(self)):
+            yield self.path(path_id)
+
+    def path_candidates(self, literal: str | None) -> Iterator[str]:
+        """Yield paths that may contain `literal`.
+
+        Literal without path separator is looked up in trigrams of path
+        components, paths holding a matching component are yielded.
+        """
+        if not literal:
+            return self.keys()
+        if os.sep in literal:
+            return (path for path in self.keys() if literal in path)
+
+        name_ids: Iterable[int]
+        if len(literal) < TRIGRAM_SIZE:
+            name_ids = range(len(self._name_offsets) - 1)
+        else:
+            name_ids = self._name_grams.lookup(literal)
+        path_ids: set[int] = set()
+        offsets, files = self._name_offsets, self._name_file_offsets
+        for i in name_ids:
+            name = bytes(self._name_blob[offsets[i] : offsets[i + 1]]).decode("utf-8")
+            if literal in name:
+                path_ids.update(self._name_files[files[i] : files[i + 1]])
+        return (self.path(path_id) for path_id in sorted(path_ids))
+
+    def candidates(
+        self, literal: str | None
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        """Yield numbered lines of files that may contain `literal`.
+
+        For a literal, only lines whose raw bytes contain it are decoded,
+        so pages of files without a trigram hit are never touched.
+        """
+        if not literal:
+            for fpath, lines in self.files():
+                yield fpath, enumerate(lines, start=1)
+            return
+
+        if len(literal) < TRIGRAM_SIZE:
+            path_ids: Iterable[int] = range(len(self))
+        else:
+            path_ids = self._grams.lookup(literal)
+
+        needle = literal.encode("utf-8")
+        for path_id in path_ids:
+            if self._file_lines[2 * path_id + 1] == 0:
+                continue
+            yield self.path(path_id), self._matching_lines(path_id, needle)
+
+    def candidates_any(
+        self, literals: Sequence[str]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        """Yield numbered lines of files that may contain any of `literals`.
+
+        Files are yielded in index order, every file is searched only for
+        literals whose trigrams it holds.
+        """
+        needles = [literal.encode("utf-8") for literal in literals]
+        files: Iterable[tuple[int, list[bytes]]]
+        if any(len(literal) < TRIGRAM_SIZE for literal in literals):
+            files = ((path_id, needles) for path_id in range(len(self)))
+        else:
+            found: dict[int, list[bytes]] = {}
+            for literal, needle in zip(literals, needles):
+                for path_id in self._grams.lookup(literal):
+                    found.setdefault(path_id, []).append(needle)
+            files = ((path_id, found[path_id]) for path_id in sorted(found))
+
+        for path_id, file_needles in files:
+            if self._file_lines[2 * path_id + 1] == 0:
+                continue
+            yield self.path(path_id), self._lines_with_any(path_id, file_needles)
+
+    def _lines_with_any(
+        self, path_id: int, needles: list[bytes]
+    ) -> Iterator[tuple[int, str]]:
+        if len(needles) == 1:
+            return self._matching_lines(path_id, needles[0])
+        lines = merge(*(self._matching_lines(path_id, needle) for needle in needles))
+        return (next(group) for _, group in groupby(lines, key=itemgetter(0)))
+
+    def _matching_lines(
+        self, path_id: int, needle: bytes
+    ) -> Generator[tuple[int, str], None, None]:
+        first, last = self._file_lines[2 * path_id], self._file_lines[2 * path_id + 1]
+        last += first
+        data, base = self._lines_data(first)
+        end = base + self._line_offsets[last]
+
+        pos = data.find(needle, base + self._line_offsets[first], end)
+        while pos != -1:
+            i = bisect_right(self._line_offsets, pos - base, first, last) - 1
+            line_start = base + self._line_offsets[i]
+            line_end = base + self._line_offsets[i + 1]
+            yield i - first + 1, data[line_start : line_end - 1].decode("utf-8")
+            pos = data.find(needle, line_end, end)
+
+    @staticmethod
+    def load(fpath: Path) -> "MappedIndex":
+        if not MappedIndexWriter.valid_idx(fpath):
+            raise CLIIndexerException(f"Expected {fpath} to be .idx file")
+        return MappedIndex(fpath)
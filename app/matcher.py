@@ -0,0 +1,219 @@
+import re
+from array import array
+from typing import Protocol, Sequence
+from .exceptions import CLIIndexerException
+
+REGEX_SYMBOLS = frozenset(".^$*+?{}[]\\|()")
+
+Spans = array
+"""Flat array of (start, end) positions of matches."""
+
+
+class Matcher(Protocol):
+    literal: str | None
+    """Text contained in every match, None if there is no such text."""
+    literals: tuple[str, ...] | None
+    """Every match contains one of these texts, None if there are no such texts."""
+    needle: bytes | re.Pattern[bytes] | None
+    """Finds raw lines that may match, None if every line has to be decoded."""
+
+    def spans(self, text: str) -> Spans:
+        ...
+
+    def tagged(self, text: str) -> tuple[Spans, tuple[str, ...]]:
+        """Return spans and patterns that matched, patterns are empty for
+        matcher of single pattern."""
+        ...
+
+
+class LiteralMatcher:
+    """Finds plain text with `str.find`, no character has special meaning."""
+
+    __slots__ = ("literal", "literals", "needle")
+
+    def __init__(self, literal: str):
+        self.literal = literal
+        self.literals = (literal,)
+        self.needle = literal.encode("utf-8")
+
+    def tagged(self, text: str) -> tuple[Spans, tuple[str, ...]]:
+        return self.spans(text), ()
+
+    def spans(self, text: str) -> Spans:
+        literal = self.literal
+        if not literal:
+            return array("I", (0, 0))
+
+        spans = array("I")
+        size = len(literal)
+        pos = text.find(literal)
+        while pos != -1:
+            spans.append(pos)
+            pos += size
+            spans.append(pos)
+            pos = text.find(literal, pos)
+        return spans
+
+
+class RegexMatcher:
+    """Finds matches of regular expression in one `finditer` pass."""
+
+    __slots__ = ("pattern", "literal", "literals", "needle")
+
+    def __init__(self, pattern: str):
+        self.pattern = _compile(pattern)
+        self.literal = None if REGEX_SYMBOLS.intersection(pattern) else pattern
+        self.literals = None if self.literal is None else (self.literal,)
+        self.needle = None if self.literal is None else self.literal.encode("utf-8")
+
+    def tagged(self, text: str) -> tuple[Spans, tuple[str, ...]]:
+        return self.spans(text), ()
+
+    def spans(self, text: str) -> Spans:
+        return _spans(self.pattern, text)
+
+
+def _spans(pattern: re.Pattern, text: str) -> Spans:
+    spans = array("I")
+    for m in pattern.finditer(text):
+        spans.extend(m.span())
+    return spans
+
+
+def _union(parts: list[Spans]) -> Spans:
+    """Spans of all `parts` in order of text, overlapping ones are joined."""
+    if len(parts) == 1:
+        return parts[0]
+    pairs = sorted((s[i], s[i + 1]) for s in parts for i in range(0, len(s), 2))
+    spans = array("I")
+    for start, end in pairs:
+        if spans and start < spans[-1]:
+            spans[-1] = max(spans[-1], end)
+        else:
+            spans.extend((start, end))
+    return spans
+
+
+def _tagged(
+    matchers: Sequence["LiteralMatcher | RegexMatcher"],
+    patterns: Sequence[str],
+    text: str,
+) -> tuple[Spans, tuple[str, ...]]:
+    """Union of spans of all `matchers` and patterns of those that matched."""
+    parts = []
+    tags = []
+    for matcher, pattern in zip(matchers, patterns):
+        if spans := matcher.spans(text):
+            parts.append(spans)
+            tags.append(pattern)
+    if not parts:
+        return array("I"), ()
+    return _union(parts), tuple(tags)
+
+
+def _compile(pattern: str) -> re.Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise CLIIndexerException(f"invalid regex `{pattern}`: {e}")
+
+
+def trie_regex(words: Sequence[str]) -> str:
+    """Build regex matching any of `words`, longest word wins at a position.
+
+    Words are merged into a trie first, so regex engine follows shared
+    prefixes once instead of trying every word at every position, similarly
+    to Aho-Corasick automaton.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(c) + build(child) for c, child in node.items() if c]
+        if not branches:
+            return ""
+        if "" in node:
+            # greedy optional group prefers longer word ending below this node
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class MultiMatcher:
+    """Finds any of many plain text patterns.
+
+    Lines without any pattern are rejected in one pass over text, every
+    pattern is looked up on its own only in lines that contain some of them,
+    so overlapping patterns are all reported.
+    """
+
+    __slots__ = ("patterns", "pattern", "literal", "literals", "needle", "_matchers")
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(dict.fromkeys(patterns))
+        regex = trie_regex(self.patterns)
+        self.pattern = re.compile(regex)
+        self.literal = None
+        self.literals = tuple(self.patterns)
+        self.needle = re.compile(regex.encode("utf-8"))
+        self._matchers = [LiteralMatcher(pattern) for pattern in self.patterns]
+
+    def spans(self, text: str) -> Spans:
+        return self.tagged(text)[0]
+
+    def tagged(self, text: str) -> tuple[Spans, tuple[str, ...]]:
+        if self.pattern.search(text) is None:
+            return array("I"), ()
+        return _tagged(self._matchers, self.patterns, text)
+
+
+class MultiRegexMatcher:
+    """Finds any of many regular expressions.
+
+    Every pattern is compiled on its own, so its groups, backreferences and
+    inline flags keep their meaning.
+    """
+
+    __slots__ = ("patterns", "literal", "literals", "needle", "_matchers")
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(dict.fromkeys(patterns))
+        self._matchers = [RegexMatcher(pattern) for pattern in self.patterns]
+        self.literal = None
+        literals = tuple(m.literal for m in self._matchers if m.literal is not None)
+        self.literals = literals if len(literals) == len(self._matchers) else None
+        self.needle = None
+
+    def spans(self, text: str) -> Spans:
+        return self.tagged(text)[0]
+
+    def tagged(self, text: str) -> tuple[Spans, tuple[str, ...]]:
+        return _tagged(self._matchers, self.patterns, text)
+
+
+def make_matcher(query: str | Sequence[str], regex: bool = False) -> Matcher:
+    """Create matcher of `query`, either single pattern or several of them.
+
+    Patterns are regular expressions if `regex` is set, plain text otherwise.
+
+    Raises:
+        CLIIndexerException: raised if pattern is not valid regular expression
+            or there is no pattern
+    """
+    patterns = [query] if isinstance(query, str) else list(query)
+    if not patterns:
+        raise CLIIndexerException("no pattern to search")
+    if len(patterns) == 1:
+        return RegexMatcher(patterns[0]) if regex else LiteralMatcher(patterns[0])
+    if regex:
+        return MultiRegexMatcher(patterns)
+    if "" in patterns:
+        return LiteralMatcher("")
+    return MultiMatcher(patterns)
@@ -1,3 +1,4 @@
+import sys
 from time import perf_counter
 from functools import wraps
 from typing import Any, Callable
@@ -11,7 +12,8 @@ def measure_time(print_result_predicate: Callable[[Any], bool]):
             res: Any = fn(*args, **kwargs)
             toc = perf_counter()
             if print_result_predicate(res):
-                print(f"{((toc - tic) * 1000):.0f} ms")
+                # stderr, so time is never mixed into results
+                print(f"{((toc - tic) * 1000):.0f} ms", file=sys.stderr)
             return res
 
         return wrapper
@@ -0,0 +1,117 @@
+import json
+import sys
+from time import monotonic
+from typing import TextIO
+from .context import Context
+from .entity import OutputInfo
+from .stats import count, timer
+
+BUFFER_SIZE = 1 << 16
+FLUSH_INTERVAL = 0.1
+
+
+class BufferedOutput:
+    """Collects written text and passes it to `stream` in large batches.
+
+    Batch is written once it holds `size` characters, or with the first
+    text written more than `interval` seconds after previous batch, so
+    results of slow searches still show up while search runs.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        size: int = BUFFER_SIZE,
+        interval: float = FLUSH_INTERVAL,
+    ):
+        # resolved on creation, so output redirected by server is respected
+        self.stream = stream if stream is not None else sys.stdout
+        self.size = size
+        self.interval = interval
+        self._parts: list[str] = []
+        self._buffered = 0
+        self._flushed = monotonic()
+
+    def write(self, text: str):
+        self._parts.append(text)
+        self._buffered += len(text)
+        if (
+            self._buffered >= self.size
+            or monotonic() - self._flushed >= self.interval
+        ):
+            self.flush()
+
+    def flush(self):
+        with timer("output"):
+            if self._parts:
+                self.stream.write("".join(self._parts))
+                self._parts.clear()
+                self._buffered = 0
+            self.stream.flush()
+        self._flushed = monotonic()
+
+    def __enter__(self) -> "BufferedOutput":
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def machine_output() -> bool:
+    return Context.output_format != "text"
+
+
+def status(text: str):
+    """Print message about search, to stderr if stdout carries results only."""
+    print(text, file=sys.stderr if machine_output() else sys.stdout)
+
+
+class ResultOutput(BufferedOutput):
+    """Writes search results in format chosen by global options.
+
+    Every result is serialized as soon as it is written, JSON array is
+    opened by the first result and closed on exit.
+    """
+
+    def __init__(
+        self,
+        files_only: bool = False,
+        spaced: bool = False,
+        stream: TextIO | None = None,
+    ):
+        super().__init__(stream)
+        self.output_format = Context.output_format
+        self.files_only = files_only
+        self.spaced = spaced
+        self.count = 0
+
+    def _data(self, item: OutputInfo) -> dict:
+        return {"path": item.fpath} if self.files_only else item.as_dict()
+
+    def result(self, item: OutputInfo):
+        with timer("format"):
+            text = self._render(item)
+        self.write(text)
+        self.count += 1
+        count("results")
+
+    def _render(self, item: OutputInfo) -> str:
+        match self.output_format:
+            case "json":
+                separator = ",\n" if self.count else "[\n"
+                return separator + json.dumps(self._data(item), ensure_ascii=False)
+            case "jsonl":
+                return json.dumps(self._data(item), ensure_ascii=False) + "\n"
+            case "null":
+                return item.fpath + "\0"
+            case _ if self.files_only:
+                return item.format_fpath() + "\n"
+            case _ if self.spaced:
+                return item.format() + "\n"
+            case _:
+                return item.format()
+
+    def __exit__(self, *exc):
+        if self.output_format == "json":
+            self.write("\n]\n" if self.count else "[]\n")
+        self.flush()
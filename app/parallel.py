@@ -0,0 +1,88 @@
+import signal
+from functools import partial
+from itertools import takewhile
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, TypeVar
+from .context import Context
+from .stats import Stats
+
+if TYPE_CHECKING:
+    from multiprocessing.synchronize import Event
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_stopped: "Event | None" = None
+"""Set in worker processes once results of their pool are no longer wanted."""
+
+
+def _init_worker(stopped: "Event"):
+    """Ctrl+C is left to main process, so no call is lost in a worker."""
+    global _stopped
+    _stopped = stopped
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _unless_stopped(fn: Callable[[T], R], item: T) -> R | None:
+    if _stopped is not None and _stopped.is_set():
+        return None
+    return fn(item)
+
+
+def _measured(fn: Callable[[T], R], item: T) -> tuple[R, Stats]:
+    """Apply `fn` in worker, return stats collected by it with the result."""
+    Context.stats = stats = Stats()
+    try:
+        return fn(item), stats
+    finally:
+        Context.stats = None
+
+
+def parallel_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    jobs: int = 1,
+    ordered: bool = True,
+    chunksize: int = 64,
+) -> Iterator[R]:
+    """Map `fn` over `items` in pool of worker processes.
+
+    Results are streamed back as they are produced. When returned iterator
+    is closed before being exhausted, no more items are taken, queued items
+    are skipped and pool is closed once running calls finish. Workers are
+    never killed, worker killed while sending its result would leave result
+    queue locked and pool could not be shut down. Stats collected by workers
+    are merged into `Context.stats` if it is set.
+
+    Args:
+        fn (Callable): picklable function applied to every item
+        items (Iterable): items to process
+        jobs (int): number of worker processes, 1 or less maps in current process
+        ordered (bool): yield results in order of `items`
+        chunksize (int): number of items sent to worker at once
+
+    Yields:
+        results of `fn`
+    """
+    if jobs <= 1:
+        yield from map(fn, items)
+        return
+
+    from multiprocessing import Event, Pool
+
+    stopped = Event()
+    items = takewhile(lambda _: not stopped.is_set(), items)
+    with Pool(jobs, _init_worker, (stopped,)) as pool:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        try:
+            if (stats := Context.stats) is None:
+                yield from mapper(partial(_unless_stopped, fn), items, chunksize)
+                return
+
+            measured = partial(_unless_stopped, partial(_measured, fn))
+            for result, worker_stats in mapper(measured, items, chunksize):
+                stats.merge(worker_stats)
+                yield result
+        finally:
+            stopped.set()
+            pool.close()
+            pool.join()
@@ -0,0 +1,163 @@
+import os
+import sys
+from array import array
+from typing import Iterable, Iterator
+from .trigram import TRIGRAM_SIZE, trigrams
+
+ROOT = -1
+
+
+class PathTable:
+    """Paths stored as tree of path components.
+
+    Every distinct component of every directory is stored once, path is
+    identified by id of its last node. Ids are assigned in insertion order.
+    Besides the tree, table keeps index from component names to nodes and
+    trigram index of names, so substring of a name is found without
+    looping through all paths.
+
+    Only parents and names are pickled, lookup structures are rebuilt on load.
+    """
+
+    def __init__(self):
+        self._parents = array("i")
+        self._names: list[str] = []
+        self._rebuild()
+
+    def _rebuild(self):
+        self._children: dict[tuple[int, str], int] = {}
+        self._kids: dict[int, list[int]] = {}
+        self._name_nodes: dict[str, list[int]] = {}
+        self._name_trigrams: dict[str, set[str]] = {}
+        for node, (parent, name) in enumerate(zip(self._parents, self._names)):
+            self._link(node, parent, name)
+
+    def _link(self, node: int, parent: int, name: str):
+        self._children[(parent, name)] = node
+        self._kids.setdefault(parent, []).append(node)
+        if (nodes := self._name_nodes.get(name)) is None:
+            self._name_nodes[name] = [node]
+            for gram in trigrams(name):
+                self._name_trigrams.setdefault(gram, set()).add(name)
+        else:
+            nodes.append(node)
+
+    def __getstate__(self):
+        return {"parents": self._parents, "names": self._names}
+
+    def __setstate__(self, state):
+        self._parents = state["parents"]
+        self._names = state["names"]
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, path: str) -> int:
+        """Add path to table, return its id."""
+        node = ROOT
+        for name in path.split(os.sep):
+            if (child := self._children.get((node, name))) is None:
+                child = len(self._names)
+                name = sys.intern(name)
+                self._parents.append(node)
+                self._names.append(name)
+                self._link(child, node, name)
+            node = child
+        return node
+
+    def compact(
+        self, keep: Iterable[int], slack: float = 0.25
+    ) -> dict[int, int] | None:
+        """Drop nodes that are neither in `keep` nor directories above them.
+
+        Table is rebuilt only when at least `slack` part of its nodes would
+        be dropped, remaining nodes keep their order.
+
+        Returns:
+            dict[int, int] | None: new id of every kept node, None if table
+                was not rebuilt
+        """
+        live = bytearray(len(self._names))
+        for node in keep:
+            while node != ROOT and not live[node]:
+                live[node] = 1
+                node = self._parents[node]
+        dropped = live.count(0)
+        if dropped == 0 or dropped < slack * len(live):
+            return None
+
+        moved: dict[int, int] = {}
+        parents = array("i")
+        names: list[str] = []
+        for node, alive in enumerate(live):
+            if alive:
+                moved[node] = len(names)
+                parent = self._parents[node]
+                parents.append(ROOT if parent == ROOT else moved[parent])
+                names.append(self._names[node])
+        self._parents, self._names = parents, names
+        self._rebuild()
+        return moved
+
+    def find(self, path: str) -> int | None:
+        """Return id of path, None if path is not in table."""
+        node = ROOT
+        for name in path.split(os.sep):
+            if (node := self._children.get((node, name), ROOT)) == ROOT:
+                return None
+        return node
+
+    def path(self, node: int) -> str:
+        names = []
+        while node != ROOT:
+            names.append(self._names[node])
+            node = self._parents[node]
+        return os.sep.join(reversed(names))
+
+    def paths(self, nodes: Iterable[int]) -> Iterator[str]:
+        """Yield paths of `nodes`, directory paths are shared between siblings."""
+        dirs: dict[int, str] = {}
+        for node in nodes:
+            parent = self._parents[node]
+            if parent == ROOT:
+                yield self._names[node]
+                continue
+            if (dir_path := dirs.get(parent)) is None:
+                if len(dirs) > 1024:
+                    dirs.clear()
+                dir_path = dirs[parent] = self.path(parent)
+            yield dir_path + os.sep + self._names[node]
+
+    def names_containing(self, part: str) -> Iterator[str]:
+        """Yield distinct component names containing `part`."""
+        if len(part) < TRIGRAM_SIZE:
+            names: Iterable[str] = self._name_nodes.keys()
+        else:
+            postings = sorted(
+                (self._name_trigrams.get(gram, set()) for gram in trigrams(part)),
+                key=len,
+            )
+            names = set(postings[0]).intersection(*postings[1:])
+        return (name for name in names if part in name)
+
+    def containing(self, part: str) -> set[int]:
+        """Return ids of all nodes whose path contains `part`.
+
+        `part` must not contain path separator, so it can only occur within
+        single component. Nodes of matching components are looked up through
+        name index and all their descendants are collected.
+        """
+        found: set[int] = set()
+        stack = [
+            node
+            for name in self.names_containing(part)
+            for node in self._name_nodes[name]
+        ]
+        while stack:
+            node = stack.pop()
+            if node in found:
+                continue
+            found.add(node)
+            stack.extend(self._kids.get(node, ()))
+        return found
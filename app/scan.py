@@ -0,0 +1,153 @@
+import re
+from functools import partial
+from itertools import chain
+from typing import Callable, Iterator
+from .filters import FileFilter
+from .stats import count, timed
+
+CHUNK_SIZE = 1 << 20
+
+Needle = bytes | re.Pattern[bytes]
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8")
+
+
+# line boundaries of str.splitlines() other than `\n`, encoded in utf-8
+LINE_BREAKS = (
+    b"\r\n",
+    b"\r",
+    b"\x0b",
+    b"\x0c",
+    b"\x1c",
+    b"\x1d",
+    b"\x1e",
+    b"\xc2\x85",
+    b"\xe2\x80\xa8",
+    b"\xe2\x80\xa9",
+)
+
+
+def _newlines(chunk: bytes) -> bytes:
+    """Translate every line boundary of `str.splitlines()` to `\n`."""
+    for brk in LINE_BREAKS:
+        if brk in chunk:
+            chunk = chunk.replace(brk, b"\n")
+    return chunk
+
+
+def _open_break(chunk: bytes) -> int:
+    """Number of trailing bytes of `chunk` that may start a line boundary."""
+    if chunk.endswith(b"\xe2\x80"):
+        return 2
+    if chunk.endswith((b"\r", b"\xc2", b"\xe2")):
+        return 1
+    return 0
+
+
+def split_lines(data: bytes) -> list[str]:
+    """Decode utf-8 `data` and split it to lines like `str.splitlines()`.
+
+    Raises:
+        UnicodeDecodeError: raised if `data` is not valid utf-8
+    """
+    lines = _decode(_newlines(data)).split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def _find(block: bytes, needle: Needle, pos: int) -> int:
+    if isinstance(needle, bytes):
+        return block.find(needle, pos)
+    match = needle.search(block, pos)
+    return -1 if match is None else match.start()
+
+
+def _block_lines(
+    block: bytes,
+    needle: Needle | None,
+    line_no: int,
+    decode: Callable[[bytes], str] = _decode,
+) -> Iterator[tuple[int, str]]:
+    if not needle:
+        lines = block.split(b"\n")
+        if block.endswith(b"\n"):
+            lines.pop()
+        for i, raw in enumerate(lines, start=line_no):
+            yield i, decode(raw)
+        return
+
+    counted = 0
+    pos = _find(block, needle, 0)
+    while pos != -1:
+        start = block.rfind(b"\n", 0, pos) + 1
+        end = block.find(b"\n", pos)
+        if end == -1:
+            end = len(block)
+
+        line_no += block.count(b"\n", counted, start)
+        counted = start
+        yield line_no, decode(block[start:end])
+
+        pos = _find(block, needle, end + 1)
+
+
+def scan_lines(
+    fpath: str,
+    needle: Needle | None,
+    chunk_size: int = CHUNK_SIZE,
+    file_filter: FileFilter = FileFilter(),
+) -> Iterator[tuple[int, str]]:
+    """Yield numbered lines of file that contain `needle`.
+
+    File is read in binary chunks of `chunk_size` bytes and raw bytes are
+    searched first for `needle` text or pattern, only lines with a hit are
+    decoded. Chunks are cut at the
+    last newline, so no line is split between them. Lines are split on the
+    same boundaries as by `split_lines()`. If `needle` is None or
+    empty, every line is yielded. Nothing is yielded for binary file.
+
+    Raises:
+        OSError: raised if file cannot be read
+        UnicodeDecodeError: raised if line with a hit is not valid utf-8
+    """
+    if isinstance(needle, bytes) and b"\n" in _newlines(needle):
+        return
+
+    decode = timed(_decode, "decode")
+    line_no = 1
+    with open(fpath, "rb") as f:
+        count("files_read")
+        chunks = iter(timed(partial(f.read, chunk_size), "read"), b"")
+        first = next(chunks, b"")
+        if file_filter.is_binary(first):
+            return
+
+        pending: list[bytes] = []
+        carry = b""
+        for chunk in chain((first,), chunks):
+            count("bytes_read", len(chunk))
+            if carry:
+                chunk, carry = carry + chunk, b""
+            # `\r` or start of utf-8 sequence at the end may continue in next chunk
+            if tail := _open_break(chunk):
+                chunk, carry = chunk[:-tail], chunk[-tail:]
+            chunk = _newlines(chunk)
+            cut = chunk.rfind(b"\n") + 1
+            if cut == 0:
+                pending.append(chunk)
+                continue
+
+            pending.append(chunk[:cut])
+            block = b"".join(pending)
+            pending = [chunk[cut:]]
+
+            yield from _block_lines(block, needle, line_no, decode)
+            line_no += block.count(b"\n")
+
+        if carry:
+            pending.append(_newlines(carry))
+        if block := b"".join(pending):
+            yield from _block_lines(block, needle, line_no, decode)
@@ -0,0 +1,260 @@
+import getpass
+import io
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import gettempdir
+from typing import Callable, TextIO
+from .exceptions import CLIIndexerException
+
+FRAME = struct.Struct(">cI")
+REQUEST, OUTPUT, ERROR, STATUS = b"q", b"o", b"e", b"s"
+BUFFER_SIZE = 1 << 16
+
+Dispatch = Callable[[list[str], str, list[str]], int]
+
+
+def default_socket() -> Path:
+    """Socket in runtime directory of user, or in private directory in tmp."""
+    if runtime_dir := os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(runtime_dir) / "cli-indexer.sock"
+    return Path(gettempdir()) / f"cli-indexer-{getpass.getuser()}" / "server.sock"
+
+
+def _owned(st: os.stat_result) -> bool:
+    """True if file is owned by current user, always true without uids."""
+    return not hasattr(os, "getuid") or st.st_uid == os.getuid()
+
+
+def _private_dir(path: Path):
+    """Create directory of socket accessible only by current user.
+
+    Raises:
+        CLIIndexerException: raised if directory belongs to other user or
+            others can access it
+    """
+    try:
+        path.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        raise CLIIndexerException(f"cannot create {path}: {e.strerror}")
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or not _owned(st) or st.st_mode & 0o077:
+        raise CLIIndexerException(f"{path} is not private directory of current user")
+
+
+def _check_support():
+    if not hasattr(socket, "AF_UNIX"):
+        raise CLIIndexerException("unix sockets are not supported on this platform")
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def send_frame(sock: socket.socket, kind: bytes, payload: bytes):
+    sock.sendall(FRAME.pack(kind, len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes | None:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, BUFFER_SIZE))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(sock: socket.socket) -> tuple[bytes, bytes] | None:
+    """Read one frame, None if connection was closed."""
+    if (header := _recv_exact(sock, FRAME.size)) is None:
+        return None
+    kind, size = FRAME.unpack(header)
+    if (payload := _recv_exact(sock, size)) is None:
+        return None
+    return kind, payload
+
+
+class FrameWriter(io.TextIOBase):
+    """Text stream sending written output to client in buffered frames."""
+
+    def __init__(self, sock: socket.socket, kind: bytes = OUTPUT):
+        self.sock = sock
+        self.kind = kind
+        self._buffer: list[str] = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= BUFFER_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            send_frame(self.sock, self.kind, "".join(self._buffer).encode("utf-8"))
+            self._buffer.clear()
+            self._size = 0
+
+
+class IndexServer:
+    """Answers commands sent by `request` over unix socket.
+
+    Requests are handled one by one in the process that started the server,
+    so indexes loaded by previous requests stay in memory. Standard and error
+    output of command are streamed back to client, exit status is sent as
+    the last frame.
+    """
+
+    def __init__(self, path: Path, dispatch: Dispatch):
+        self.path = path
+        self.dispatch = dispatch
+
+    def _remove_stale(self):
+        """Remove socket left by server that is not running anymore.
+
+        Raises:
+            CLIIndexerException: raised if server is running, or path is not
+                a socket of current user
+        """
+        try:
+            st = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        except PermissionError:
+            raise CLIIndexerException(f"cannot access {self.path}")
+        if not stat.S_ISSOCK(st.st_mode) or not _owned(st):
+            raise CLIIndexerException(
+                f"{self.path} exists and is not a socket of current user"
+            )
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(self.path))
+            except OSError:
+                try:
+                    self.path.unlink()
+                except PermissionError:
+                    raise CLIIndexerException(f"cannot remove {self.path}")
+                return
+        raise CLIIndexerException(f"server is already running on {self.path}")
+
+    def serve_forever(self, ready: Callable[[], None] = lambda: None):
+        """Serve until interrupted, SIGTERM is handled same as SIGINT."""
+        _check_support()
+        if self.path == default_socket():
+            _private_dir(self.path.parent)
+        self._remove_stale()
+        previous = signal.signal(signal.SIGTERM, _interrupt)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(str(self.path))
+            try:
+                server.listen()
+                ready()
+                while True:
+                    conn, _ = server.accept()
+                    with conn:
+                        self.handle(conn)
+            finally:
+                self.path.unlink(missing_ok=True)
+                signal.signal(signal.SIGTERM, previous)
+
+    def handle(self, conn: socket.socket):
+        try:
+            frame = read_frame(conn)
+            if frame is None or frame[0] != REQUEST:
+                return
+            request = json.loads(frame[1])
+
+            writer = FrameWriter(conn)
+            errors = FrameWriter(conn, ERROR)
+            status = self._execute(request, writer, errors)
+            errors.flush()
+            writer.flush()
+            send_frame(conn, STATUS, str(status).encode())
+        except (OSError, ValueError):
+            # client went away or sent malformed request, nothing to answer
+            return
+
+    def _execute(self, request: dict, writer: TextIO, errors: TextIO) -> int:
+        cwd = os.getcwd()
+        try:
+            with redirect_stdout(writer), redirect_stderr(errors):
+                try:
+                    os.chdir(request["cwd"])
+                    return self.dispatch(
+                        request["options"], request["command"], request["args"]
+                    )
+                except (OSError, KeyError) as e:
+                    print(f"invalid request: {e}")
+                    return 1
+                except Exception:
+                    traceback.print_exc(file=sys.__stderr__)
+                    print("internal server error")
+                    return 1
+        finally:
+            os.chdir(cwd)
+
+
+def request(
+    path: Path,
+    options: list[str],
+    command: str,
+    args: list[str],
+    out: TextIO | None = None,
+    err: TextIO | None = None,
+) -> int:
+    """Send command to server listening on `path` and print its output.
+
+    Raises:
+        CLIIndexerException: raised if server cannot be reached, or socket
+            belongs to other user
+
+    Returns:
+        int: exit status of the command
+    """
+    _check_support()
+    out = out or sys.stdout
+    err = err or sys.stderr
+    payload = {
+        "cwd": os.getcwd(),
+        "options": options,
+        "command": command,
+        "args": args,
+    }
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise CLIIndexerException(f"cannot connect to server on {path}")
+    if not _owned(st):
+        raise CLIIndexerException(f"server on {path} is run by other user")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            raise CLIIndexerException(f"cannot connect to server on {path}")
+        send_frame(sock, REQUEST, json.dumps(payload).encode("utf-8"))
+
+        while (frame := read_frame(sock)) is not None:
+            kind, data = frame
+            if kind == OUTPUT:
+                out.write(data.decode("utf-8"))
+            elif kind == ERROR:
+                err.write(data.decode("utf-8"))
+            elif kind == STATUS:
+                return int(data)
+    raise CLIIndexerException("server closed connection")
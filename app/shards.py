@@ -0,0 +1,235 @@
+import os
+import zlib
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+from .exceptions import CLIIndexerException
+
+if TYPE_CHECKING:
+    from .index import Index, IndexDB
+    from .interfaces import Searchable
+    from .mapped import MappedIndexWriter
+
+MANIFEST_SUFFIX = ".shards"
+SHARD_SUFFIXES = (".pkl", ".idx", ".db", ".sqlite")
+DEFAULT_SHARDS = 4
+
+
+def valid_manifest(fpath: Path) -> bool:
+    return fpath.suffix == MANIFEST_SUFFIX
+
+
+def shard_of(path: str, count: int) -> int:
+    """Shard holding `path`, same file is always in the same shard.
+
+    Absolute path is hashed, so relative and absolute spelling of root of
+    the index lead to the same shard.
+    """
+    return zlib.crc32(os.fsencode(os.path.abspath(path))) % count
+
+
+def shard_paths(manifest: Path, count: int, suffix: str) -> list[Path]:
+    """Files of shards stored next to `manifest`, e.g. index.0.pkl."""
+    stem = manifest.with_suffix("").name
+    return [manifest.with_name(f"{stem}.{i}{suffix}") for i in range(count)]
+
+
+def write_manifest(manifest: Path, shards: list[Path], root: str | None):
+    """Write manifest listing `shards`, replaced at once like index files.
+
+    Args:
+        manifest (Path): path to manifest
+        shards (list[Path]): files of shards
+        root (str | None): resolved root directory of the index, if known
+    """
+    import json
+
+    state = {
+        "version": ShardedIndex.FORMAT_VERSION,
+        "created": datetime.now().strftime(r"%d.%m.%Y %H:%M:%S"),
+        "root": root,
+        "shards": [shard.name for shard in shards],
+    }
+    tmp = manifest.with_name(manifest.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2) + "\n")
+    os.replace(tmp, manifest)
+
+
+class ShardedIndex:
+    """Index split into shards listed by manifest file.
+
+    Every shard is an ordinary index file, files are assigned to shards by
+    hash of their path. Shards are loaded one by one while they are searched,
+    so whole index never has to be in memory at once.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        manifest: Path,
+        shards: list[Path],
+        created: str,
+        root: str | None = None,
+    ):
+        self.manifest = manifest
+        self.shards = shards
+        self.created = created
+        self.root = root
+
+    def check_root(self, root: Path):
+        """Raise CLIIndexerException if index was created for other directory."""
+        if self.root is not None and str(root.resolve()) != self.root:
+            raise CLIIndexerException(
+                f"Index `{self.manifest}` was created for {self.root}, not {root}"
+            )
+
+    def shard(self, i: int) -> "Searchable":
+        from .backends import load_index
+
+        return load_index(self.shards[i])
+
+    def _loaded(self) -> Iterator["Searchable"]:
+        return (self.shard(i) for i in range(len(self.shards)))
+
+    def keys(self) -> Iterator[str]:
+        return chain.from_iterable(shard.keys() for shard in self._loaded())
+
+    def path_candidates(self, literal: str | None) -> Iterator[str]:
+        return chain.from_iterable(
+            shard.path_candidates(literal) for shard in self._loaded()
+        )
+
+    def candidates(
+        self, literal: str | None
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        return chain.from_iterable(
+            shard.candidates(literal) for shard in self._loaded()
+        )
+
+    def candidates_any(
+        self, literals: Sequence[str]
+    ) -> Iterator[tuple[str, Iterable[tuple[int, str]]]]:
+        return chain.from_iterable(
+            shard.candidates_any(literals) for shard in self._loaded()
+        )
+
+    @staticmethod
+    def load(fpath: Path) -> "ShardedIndex":
+        import json
+
+        if not fpath.is_file():
+            raise CLIIndexerException(f"No such file {fpath}")
+        try:
+            state = json.loads(fpath.read_text())
+            names = state["shards"]
+            created = state["created"]
+            root = state.get("root")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            raise CLIIndexerException(f"Cannot load `{fpath}`, may be damaged.")
+        if state.get("version") != ShardedIndex.FORMAT_VERSION:
+            raise CLIIndexerException(
+                f"Index `{fpath}` was created by other version, create it again."
+            )
+        shards = [fpath.with_name(name) for name in names]
+        return ShardedIndex(fpath, shards, created, root)
+
+
+class ShardedIndexWriter:
+    """Writes files to shards by hash of their path, then writes manifest.
+
+    Shards are updatable, if all of them are .pkl indexes.
+    """
+
+    def __init__(
+        self,
+        manifest: Path,
+        indexes: list["Index | MappedIndexWriter | IndexDB"],
+        shards: list[Path],
+        root: str | None = None,
+    ):
+        self.manifest = manifest
+        self.indexes = indexes
+        self.shards = shards
+        self.root = root
+
+    @staticmethod
+    def create(
+        manifest: Path,
+        count: int,
+        suffix: str = ".pkl",
+        compression: str | None = None,
+        root: Path | None = None,
+    ) -> "ShardedIndexWriter":
+        """Create empty shards, files of previous shards are removed.
+
+        Compression of lines can be used only for .idx shards. Resolved
+        `root` is written to manifest, so shards are not updated from other
+        directory later.
+        """
+        from .backends import create_index
+
+        if count < 1:
+            raise CLIIndexerException("number of shards has to be at least 1")
+        if suffix not in SHARD_SUFFIXES:
+            raise CLIIndexerException(
+                f"Expected shards to be one of {', '.join(SHARD_SUFFIXES)} files"
+            )
+        if compression is not None and suffix != ".idx":
+            raise CLIIndexerException("only .idx shards can be compressed")
+        if manifest.is_file():
+            for shard in ShardedIndex.load(manifest).shards:
+                shard.unlink(missing_ok=True)
+
+        shards = shard_paths(manifest, count, suffix)
+        for shard in shards:
+            shard.unlink(missing_ok=True)
+        return ShardedIndexWriter(
+            manifest,
+            [create_index(shard, compression) for shard in shards],
+            shards,
+            None if root is None else str(root.resolve()),
+        )
+
+    @staticmethod
+    def open(manifest: Path, root: Path) -> "ShardedIndexWriter":
+        """Open existing .pkl shards for update of index of `root`."""
+        from .index import Index
+
+        loaded = ShardedIndex.load(manifest)
+        loaded.check_root(root)
+        shards = loaded.shards
+        if not all(Index.valid_pkl(shard) for shard in shards):
+            raise CLIIndexerException("only .pkl shards can be updated")
+        indexes = []
+        for shard in shards:
+            index = Index.load(shard) if shard.is_file() else Index(shard)
+            index.dst = shard
+            indexes.append(index)
+        return ShardedIndexWriter(manifest, indexes, shards, loaded.root)
+
+    def _index(self, path: str) -> "Index":
+        return self.indexes[shard_of(path, len(self.indexes))]  # type: ignore
+
+    def insert(self, path: str, lines: list[str]):
+        self._index(path).insert(path, lines)
+
+    def remove(self, path: str):
+        self._index(path).remove(path)
+
+    def signature(self, path: str) -> tuple[int, int, int] | None:
+        return self._index(path).signature(path)
+
+    def set_signature(self, path: str, signature: tuple[int, int, int]):
+        self._index(path).set_signature(path, signature)
+
+    def signed_paths(self) -> Iterator[str]:
+        return chain.from_iterable(
+            index.signed_paths() for index in self.indexes  # type: ignore
+        )
+
+    def dump(self):
+        for index in self.indexes:
+            index.dump()
+        write_manifest(self.manifest, self.shards, self.root)
@@ -0,0 +1,189 @@
+import sys
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ContextManager,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
+from .context import Context
+
+if TYPE_CHECKING:
+    import tracemalloc
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MEMORY_TOP = 25
+
+
+class Stats:
+    """Named timers and counters collected while command runs.
+
+    Timer sums time spent in every call of timed code and counts the calls,
+    counters count anything else, e.g. files or bytes read.
+    """
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        tic = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - tic)
+
+    def timed(self, fn: Callable[..., R], name: str) -> Callable[..., R]:
+        """Wrap `fn`, so time of every call is added to timer `name`."""
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            tic = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add_time(name, perf_counter() - tic)
+
+        return wrapper
+
+    def timed_iter(self, items: Iterable[T], name: str) -> Iterator[T]:
+        """Yield `items`, time spent producing them is added to timer `name`."""
+        it = iter(items)
+        while True:
+            tic = perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add_time(name, perf_counter() - tic, 0)
+                return
+            self.add_time(name, perf_counter() - tic)
+            yield item
+
+    def merge(self, other: "Stats"):
+        for name, seconds in other.seconds.items():
+            self.add_time(name, seconds, other.calls[name])
+        for name, value in other.counters.items():
+            self.count(name, value)
+
+    def as_dict(self) -> dict:
+        return {
+            "timers": {
+                name: {"ms": seconds * 1000, "calls": self.calls[name]}
+                for name, seconds in self.seconds.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def format(self) -> str:
+        lines = ["Timers:"]
+        for name, seconds in self.seconds.items():
+            lines.append(
+                f"    {name:10} {seconds * 1000:10.1f} ms {self.calls[name]:10} calls"
+            )
+        lines.append("Counters:")
+        for name, value in self.counters.items():
+            lines.append(f"    {name:10} {value:10}")
+        return "\n".join(lines)
+
+
+def timer(name: str) -> ContextManager:
+    """Timer `name` of current stats, nothing is measured if stats are off."""
+    stats = Context.stats
+    return nullcontext() if stats is None else stats.timer(name)
+
+
+def timed(fn: Callable[..., R], name: str) -> Callable[..., R]:
+    stats = Context.stats
+    return fn if stats is None else stats.timed(fn, name)
+
+
+def timed_iter(items: Iterable[T], name: str) -> Iterable[T]:
+    stats = Context.stats
+    return items if stats is None else stats.timed_iter(items, name)
+
+
+def timed_walk(items: Iterable[T], jobs: int = 1) -> Iterable[T]:
+    """Time walk producing `items`.
+
+    With `jobs` > 1 items are consumed by feeder thread of process pool and
+    measured time includes waiting of the thread for the main one, so it is
+    added to timer `walk_feed` instead of `walk`.
+    """
+    return timed_iter(items, "walk" if jobs <= 1 else "walk_feed")
+
+
+def count(name: str, value: int = 1):
+    if (stats := Context.stats) is not None:
+        stats.count(name, value)
+
+
+def _write_memory(snapshot: "tracemalloc.Snapshot", peak: int, dst: Path):
+    lines = [f"peak traced memory: {peak / (1 << 20):.1f} MB"]
+    lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:MEMORY_TOP])
+    dst.write_text("\n".join(lines) + "\n")
+
+
+@contextmanager
+def instrument() -> Iterator[None]:
+    """Collect stats and profile of command as requested by global options.
+
+    Stats are printed to stderr once command finishes. Profile is written
+    in cProfile format to the requested path, allocations traced by
+    tracemalloc next to it with `.mem` suffix.
+    """
+    stats_format, profile_path = Context.stats_format, Context.profile
+    if stats_format is None and profile_path is None:
+        yield
+        return
+
+    stats = Stats()
+    profiler = None
+    if profile_path is not None:
+        # profilers are imported only when profiling was requested
+        import cProfile
+        import tracemalloc
+
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+
+    Context.stats = stats
+    tic = perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_time("total", perf_counter() - tic)
+        Context.stats = None
+
+        if profiler is not None and profile_path is not None:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            profiler.dump_stats(profile_path)
+            _write_memory(
+                snapshot, peak, profile_path.with_name(profile_path.name + ".mem")
+            )
+
+        if stats_format == "json":
+            import json
+
+            print(json.dumps(stats.as_dict()), file=sys.stderr)
+        elif stats_format is not None:
+            print(stats.format(), file=sys.stderr)
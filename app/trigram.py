@@ -0,0 +1,5 @@
+TRIGRAM_SIZE = 3
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
@@ -0,0 +1,161 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator
+from .filters import FileFilter
+from .ignore import ALWAYS_IGNORED, IGNORE_FILES, IgnoreRules
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+
+@dataclass
+class Listing:
+    path: str
+    dirs: list[os.DirEntry] = field(default_factory=list)
+    files: list[os.DirEntry] = field(default_factory=list)
+    rules: IgnoreRules | None = None
+    readable: bool = True
+
+
+def _is_dir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def list_dir(
+    path: str, parent_rules: IgnoreRules | None, file_filter: FileFilter
+) -> Listing:
+    """List one directory with `os.scandir`, leaving out ignored and
+    filtered entries. Type and size of entries come from `DirEntry`, so no
+    extra stat is needed on most platforms."""
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return Listing(path, rules=parent_rules, readable=False)
+
+    rules = parent_rules
+    if file_filter.ignore_files:
+        names = [e.name for e in entries if e.name in IGNORE_FILES]
+        if names:
+            rules = IgnoreRules.load(path, parent_rules, sorted(names))
+
+    listing = Listing(path, rules=rules)
+    for entry in entries:
+        if _is_dir(entry):
+            if file_filter.ignore_files and (
+                entry.name in ALWAYS_IGNORED
+                or (rules is not None and rules.ignored(entry.path, True))
+            ):
+                continue
+            listing.dirs.append(entry)
+        else:
+            if rules is not None and rules.ignored(entry.path, False):
+                continue
+            if file_filter.accepts_entry(entry):
+                listing.files.append(entry)
+    return listing
+
+
+def walk_listings(
+    root: str | Path,
+    file_filter: FileFilter = FileFilter(),
+    threads: int = 1,
+    rules: IgnoreRules | None = None,
+) -> Iterator[Listing]:
+    """Walk directory tree top-down in the same order as `os.walk`.
+
+    With `threads` > 1, subdirectories are listed by thread pool ahead of
+    time, while order of listings stays the same. Symbolic links to
+    directories are followed only if `file_filter.follow_links` is set,
+    each directory is then entered at most once, so link loops terminate.
+    `rules` are ignore rules of directories above `root`.
+    """
+    root = os.fspath(root)
+    visited: set[tuple[int, int]] = set()
+
+    def enter(entry_path: str) -> bool:
+        if not file_filter.follow_links:
+            return True
+        try:
+            st = os.stat(entry_path)
+        except OSError:
+            return False
+        key = (st.st_dev, st.st_ino)
+        if key in visited:
+            return False
+        visited.add(key)
+        return True
+
+    def descend(entry: os.DirEntry) -> bool:
+        if not file_filter.follow_links and entry.is_symlink():
+            return False
+        return enter(entry.path)
+
+    if not enter(root):
+        return
+
+    executor = None
+    if threads > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(threads)
+    try:
+        stack: list["Future | tuple[str, IgnoreRules | None]"] = [(root, rules)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, tuple):
+                listing = list_dir(item[0], item[1], file_filter)
+            else:
+                listing = item.result()
+            if not listing.readable:
+                continue
+
+            yield listing
+
+            children = [entry.path for entry in listing.dirs if descend(entry)]
+            pending: list["Future | tuple[str, IgnoreRules | None]"]
+            if executor is None:
+                pending = [(path, listing.rules) for path in children]
+            else:
+                pending = [
+                    executor.submit(list_dir, path, listing.rules, file_filter)
+                    for path in children
+                ]
+            stack.extend(reversed(pending))
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def walk_entries(
+    root: str | Path, file_filter: FileFilter = FileFilter(), threads: int = 1
+) -> Iterator[os.DirEntry]:
+    for listing in walk_listings(root, file_filter, threads):
+        yield from listing.files
+
+
+def walk_files(
+    root: str | Path, file_filter: FileFilter = FileFilter(), threads: int = 1
+) -> Iterator[str]:
+    for listing in walk_listings(root, file_filter, threads):
+        for entry in listing.files:
+            yield entry.path
+
+
+def walk(
+    root: str | Path,
+    predicate: Callable[[str], bool] = lambda p: True,
+    file_filter: FileFilter = FileFilter(),
+    threads: int = 1,
+) -> Iterator[str]:
+    """Yield paths of files and of directories without subdirectories."""
+    for listing in walk_listings(root, file_filter, threads):
+        for entry in listing.files:
+            if predicate(entry.path):
+                yield entry.path
+        if not listing.dirs and predicate(listing.path):
+            yield listing.path
@@ -0,0 +1,308 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Protocol
+from .core import read_lines
+from .exceptions import CLIIndexerException
+from .filters import FileFilter
+from .ignore import ALWAYS_IGNORED, IGNORE_FILES, IgnoreRules
+from .interfaces import Updatable
+from .walker import Listing, list_dir, walk_listings
+
+POLL_INTERVAL = 1.0
+DEBOUNCE = 0.1
+
+
+class WatchBackend(Protocol):
+    def watch(self, dir_path: str) -> None:
+        ...
+
+    def unwatch(self, dir_path: str) -> None:
+        ...
+
+    def wait(self) -> list[tuple[str, bool]]:
+        """Block until something changes.
+
+        Returns:
+            list of changed paths with flag whether the path is directory
+        """
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class PollingBackend:
+    """Reports whole tree as changed every `interval` seconds."""
+
+    def __init__(self, root: str, interval: float = POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+
+    def watch(self, dir_path: str) -> None:
+        pass
+
+    def unwatch(self, dir_path: str) -> None:
+        pass
+
+    def wait(self) -> list[tuple[str, bool]]:
+        time.sleep(self.interval)
+        return [(self.root, True)]
+
+    def close(self) -> None:
+        pass
+
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_ONLYDIR
+)
+EVENT = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """Linux inotify accessed through libc, one watch per directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise CLIIndexerException(
+                f"inotify is not available: {os.strerror(ctypes.get_errno())}"
+            )
+        self._paths: dict[int, str] = {}
+        self._wds: dict[str, int] = {}
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        except OSError:
+            return False
+        return hasattr(libc, "inotify_init1")
+
+    def watch(self, dir_path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise CLIIndexerException(
+                f"cannot watch {dir_path}: {os.strerror(code)}, use --poll"
+            )
+        # directory moved within tree keeps its watch descriptor
+        if (old := self._paths.get(wd)) is not None:
+            self._wds.pop(old, None)
+        self._paths[wd] = dir_path
+        self._wds[dir_path] = wd
+
+    def unwatch(self, dir_path: str) -> None:
+        wd = self._wds.pop(dir_path, None)
+        if wd is not None and self._paths.get(wd) == dir_path:
+            del self._paths[wd]
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read(self, changed: dict[tuple[str, bool], None]):
+        data = os.read(self._fd, 1 << 16)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, size = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size : offset + EVENT.size + size]
+            offset += EVENT.size + size
+
+            if mask & IN_Q_OVERFLOW:
+                changed[(self.root, True)] = None
+            elif mask & IN_IGNORED:
+                if (path := self._paths.pop(wd, None)) is not None:
+                    self._wds.pop(path, None)
+            elif (dir_path := self._paths.get(wd)) is not None:
+                path = os.path.join(dir_path, os.fsdecode(name.rstrip(b"\0")))
+                changed[(path, bool(mask & IN_ISDIR))] = None
+
+    def wait(self) -> list[tuple[str, bool]]:
+        """Wait for events, then collect the following ones until it is quiet."""
+        changed: dict[tuple[str, bool], None] = {}
+        select.select([self._fd], [], [])
+        self._read(changed)
+        while select.select([self._fd], [], [], DEBOUNCE)[0]:
+            self._read(changed)
+        return list(changed)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class IndexWatcher:
+    """Keeps `index` up to date with files under `root`.
+
+    Every change reported by backend is applied as insert or removal of
+    single files, only directory where something changed is listed again.
+    Change of ignore file or of directory rescans its whole subtree.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        index: Updatable,
+        file_filter: FileFilter = FileFilter(),
+        backend: WatchBackend | None = None,
+    ):
+        # spelled as by index command, so paths of its index are found
+        self.root = os.fspath(Path(root))
+        self.index = index
+        self.file_filter = file_filter
+        self.backend = backend or default_backend(self.root)
+        self._rules: dict[str, IgnoreRules | None] = {}
+        self._files: dict[str, set[str]] = {}
+
+    def start(self) -> int:
+        """Watch directories under root and bring index up to date.
+
+        Returns:
+            int: number of changed files
+        """
+        if not os.path.isdir(self.root):
+            raise CLIIndexerException(f"{self.root} not a dir")
+        changed = self._rescan(self.root)
+        known = set().union(*self._files.values())
+        for fpath in [p for p in self.index.signed_paths() if p not in known]:
+            self.index.remove(fpath)
+            changed += 1
+        return changed
+
+    def run(self, on_change: Callable[[int], None]):
+        """Apply changes until interrupted, `on_change` is called after each batch."""
+        while True:
+            if changed := self.apply(self.backend.wait()):
+                on_change(changed)
+
+    def apply(self, events: Iterable[tuple[str, bool]]) -> int:
+        changed = 0
+        for path, is_dir in events:
+            dir_path, name = os.path.split(path)
+            if is_dir:
+                changed += self._rescan(path)
+            elif name in IGNORE_FILES and self.file_filter.ignore_files:
+                changed += self._rescan(dir_path)
+            elif dir_path in self._files:
+                changed += self._refresh(dir_path)
+        return changed
+
+    def close(self):
+        self.backend.close()
+
+    def _parent_rules(self, dir_path: str) -> IgnoreRules | None:
+        if dir_path == self.root:
+            return None
+        return self._rules.get(os.path.dirname(dir_path))
+
+    def _excluded(self, dir_path: str) -> bool:
+        if dir_path == self.root:
+            return False
+        parent = os.path.dirname(dir_path)
+        if parent not in self._files:
+            return True
+        if not self.file_filter.ignore_files:
+            return False
+        rules = self._rules.get(parent)
+        return os.path.basename(dir_path) in ALWAYS_IGNORED or (
+            rules is not None and rules.ignored(dir_path, True)
+        )
+
+    def _rescan(self, dir_path: str) -> int:
+        """Sync whole subtree of `dir_path`, forget directories that are gone."""
+        changed = 0
+        seen: set[str] = set()
+        if os.path.isdir(dir_path) and not self._excluded(dir_path):
+            listings = walk_listings(
+                dir_path, self.file_filter, rules=self._parent_rules(dir_path)
+            )
+            for listing in listings:
+                seen.add(listing.path)
+                changed += self._sync(listing)
+
+        prefix = dir_path + os.sep
+        for known in list(self._files):
+            if (known == dir_path or known.startswith(prefix)) and known not in seen:
+                changed += self._forget(known)
+        return changed
+
+    def _refresh(self, dir_path: str) -> int:
+        listing = list_dir(dir_path, self._parent_rules(dir_path), self.file_filter)
+        if not listing.readable:
+            return self._rescan(dir_path)
+        return self._sync(listing)
+
+    def _sync(self, listing: Listing) -> int:
+        if listing.path not in self._files:
+            self.backend.watch(listing.path)
+        self._rules[listing.path] = listing.rules
+
+        changed = 0
+        current: set[str] = set()
+        for entry in listing.files:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+
+            fpath = entry.path
+            current.add(fpath)
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+            if self.index.signature(fpath) == signature:
+                continue
+
+            if (lines := read_lines(fpath, self.file_filter)) is None:
+                self.index.remove(fpath)
+            else:
+                self.index.insert(fpath, lines)
+            self.index.set_signature(fpath, signature)
+            changed += 1
+
+        for fpath in self._files.get(listing.path, set()) - current:
+            self.index.remove(fpath)
+            changed += 1
+        self._files[listing.path] = current
+        return changed
+
+    def _forget(self, dir_path: str) -> int:
+        self.backend.unwatch(dir_path)
+        self._rules.pop(dir_path, None)
+        files = self._files.pop(dir_path, set())
+        for fpath in files:
+            self.index.remove(fpath)
+        return len(files)
+
+
+def default_backend(root: str) -> WatchBackend:
+    """Inotify backend where available, polling otherwise."""
+    if InotifyBackend.available():
+        return InotifyBackend(root)
+    return PollingBackend(root)
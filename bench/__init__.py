@@ -0,0 +1,2 @@
+from .corpus import CorpusSpec, generate
+from .run import compare, run
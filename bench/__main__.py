@@ -0,0 +1,97 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from .corpus import CorpusSpec
+from .run import compare, run
+from .startup import IMPORT_BUDGET_MS, over_budget, startup
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench",
+        description="Measure indexing and searching on generated corpus.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_p = commands.add_parser("run", help="run benchmark, print JSON report")
+    defaults = CorpusSpec()
+    run_p.add_argument("--files", type=int, default=defaults.files)
+    run_p.add_argument("--depth", type=int, default=defaults.depth)
+    run_p.add_argument("--fanout", type=int, default=defaults.fanout)
+    run_p.add_argument("--lines", type=int, default=defaults.lines)
+    run_p.add_argument("--line-length", type=int, default=defaults.line_length)
+    run_p.add_argument(
+        "--match-density",
+        type=float,
+        default=defaults.match_density,
+        help="fraction of lines and file names containing searched word",
+    )
+    run_p.add_argument(
+        "--binary-fraction", type=float, default=defaults.binary_fraction
+    )
+    run_p.add_argument("--seed", type=int, default=defaults.seed)
+    run_p.add_argument(
+        "--corpus", type=Path, help="keep corpus in this directory, reuse it"
+    )
+    run_p.add_argument("--repeat", type=int, default=5, help="queries per case")
+    run_p.add_argument("-j", "--jobs", type=int, default=1)
+    run_p.add_argument("-o", "--output", type=Path, help="write report to file")
+
+    startup_p = commands.add_parser(
+        "startup", help="measure start of CLI, fail if imports are over budget"
+    )
+    startup_p.add_argument("--repeat", type=int, default=10)
+    startup_p.add_argument(
+        "--budget",
+        type=float,
+        default=IMPORT_BUDGET_MS,
+        help="most milliseconds a search command may spend importing",
+    )
+
+    compare_p = commands.add_parser("compare", help="compare two JSON reports")
+    compare_p.add_argument("old", type=Path)
+    compare_p.add_argument("new", type=Path)
+    return parser.parse_args(argv)
+
+
+def log(text: str):
+    print(text, file=sys.stderr, flush=True)
+
+
+def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    if args.command == "compare":
+        old = json.loads(args.old.read_text())
+        new = json.loads(args.new.read_text())
+        print("\n".join(compare(old, new)))
+        return 0
+
+    if args.command == "startup":
+        results = startup(args.repeat)
+        print(json.dumps(results, indent=2))
+        if slow := over_budget(results, args.budget):
+            log(f"import time over {args.budget} ms budget: {', '.join(slow)}")
+            return 1
+        return 0
+
+    spec = CorpusSpec(
+        files=args.files,
+        depth=args.depth,
+        fanout=args.fanout,
+        lines=args.lines,
+        line_length=args.line_length,
+        match_density=args.match_density,
+        binary_fraction=args.binary_fraction,
+        seed=args.seed,
+    )
+    report = json.dumps(run(spec, args.corpus, args.repeat, args.jobs, log), indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        args.output.write_text(report + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+import os
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+NEEDLE = "needle"
+"""Word planted into matching lines and file names."""
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """Shape of generated tree, same spec and seed always give same tree."""
+
+    files: int = 2000
+    depth: int = 3
+    fanout: int = 4
+    lines: int = 200
+    line_length: int = 60
+    match_density: float = 0.01
+    binary_fraction: float = 0.05
+    seed: int = 0
+
+
+def _words(rng: random.Random, count: int) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        "".join(rng.choice(letters) for _ in range(rng.randint(2, 9)))
+        for _ in range(count)
+    ]
+
+
+def _dirs(spec: CorpusSpec) -> list[str]:
+    """Relative paths of all directories, `fanout` children on every level."""
+    dirs = [""]
+    level = [""]
+    for _ in range(spec.depth):
+        level = [
+            os.path.join(parent, f"d{i}")
+            for parent in level
+            for i in range(spec.fanout)
+        ]
+        dirs.extend(level)
+    return dirs
+
+
+def _line(rng: random.Random, words: list[str], spec: CorpusSpec) -> str:
+    parts = []
+    size = 0
+    while size < spec.line_length:
+        word = rng.choice(words)
+        parts.append(word)
+        size += len(word) + 1
+    if rng.random() < spec.match_density:
+        parts.insert(rng.randrange(len(parts) + 1), NEEDLE)
+    return " ".join(parts)
+
+
+def generate(root: Path, spec: CorpusSpec = CorpusSpec()) -> int:
+    """Write tree described by `spec` under `root`.
+
+    Returns:
+        int: number of bytes written
+    """
+    rng = random.Random(spec.seed)
+    words = _words(rng, 5000)
+    dirs = _dirs(spec)
+    written = 0
+
+    for i in range(spec.files):
+        name = f"f{i}"
+        if rng.random() < spec.match_density:
+            name += f"_{NEEDLE}"
+        dir_path = root / rng.choice(dirs)
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+        if rng.random() < spec.binary_fraction:
+            data = b"\0" + rng.randbytes(spec.lines * spec.line_length)
+            (dir_path / f"{name}.bin").write_bytes(data)
+        else:
+            text = "\n".join(_line(rng, words, spec) for _ in range(spec.lines))
+            data = text.encode("utf-8")
+            (dir_path / f"{name}.txt").write_bytes(data)
+        written += len(data)
+    return written
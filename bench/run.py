@@ -0,0 +1,221 @@
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from dataclasses import asdict
+from multiprocessing import get_context
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Iterable
+
+try:
+    import resource
+except ImportError:  # not available on windows, peak memory is not reported
+    resource = None
+
+from app.backends import create_index, load_index
+from app.core import (
+    Indexer,
+    SearchFileDirEngine,
+    SearchFileDirInfoEngine,
+    SearchInfoEngine,
+)
+from app.entity import SearchOptions
+from .corpus import NEEDLE, CorpusSpec, generate
+
+FORMAT_VERSION = 1
+BACKENDS = (".pkl", ".idx", ".db", ".shards")
+ENGINES = ("info", "searchfd", "searchfdi")
+NAME_PART = "f1"
+"""Part of file name searched together with content by searchfdi."""
+
+
+def peak_rss() -> int | None:
+    """Peak resident memory of this process in bytes, None where unknown."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def latency(samples: list[float]) -> dict[str, float]:
+    """Summary of `samples` in milliseconds."""
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "mean": statistics.fmean(ordered) * 1000,
+        "min": ordered[0] * 1000,
+        "p50": at(0.5),
+        "p90": at(0.9),
+        "p99": at(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def corpus_size(root: Path) -> tuple[int, int]:
+    """Number of files and bytes under `root`."""
+    files = size = 0
+    for dir_path, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(dir_path, name))
+    return files, size
+
+
+def _query(engine: str, source: Path, runtime: bool, options: SearchOptions):
+    match engine, runtime:
+        case "info", True:
+            return SearchInfoEngine.search_runtime(NEEDLE, source, options)
+        case "info", False:
+            return SearchInfoEngine.search_index(NEEDLE, load_index(source), options)
+        case "searchfd", True:
+            return SearchFileDirEngine.search_runtime(NEEDLE, source, options)
+        case "searchfd", False:
+            index = load_index(source)
+            return SearchFileDirEngine.search_index(NEEDLE, index, options)
+        case "searchfdi", True:
+            return SearchFileDirInfoEngine.search_runtime(
+                NAME_PART, NEEDLE, source, options
+            )
+        case _:
+            index = load_index(source)
+            return SearchFileDirInfoEngine.search_index(
+                NAME_PART, NEEDLE, index, options
+            )
+
+
+def _index_case(case: dict) -> dict:
+    root, dst = Path(case["root"]), Path(case["index"])
+    tic = perf_counter()
+    index = create_index(dst)
+    Indexer.make_index(root, index, case["jobs"])
+    index.dump()
+    seconds = perf_counter() - tic
+
+    tic = perf_counter()
+    load_index(dst)
+    return {
+        "seconds": seconds,
+        "files_per_s": case["files"] / seconds,
+        "mb_per_s": case["bytes"] / seconds / (1 << 20),
+        "index_bytes": dst.stat().st_size,
+        "load_ms": (perf_counter() - tic) * 1000,
+    }
+
+
+def _search_case(case: dict) -> dict:
+    options = SearchOptions(jobs=case["jobs"])
+    source = Path(case["source"])
+    runtime = case["backend"] is None
+
+    samples = []
+    count = 0
+    for _ in range(case["repeat"]):
+        tic = perf_counter()
+        # loading of index is part of every query, same as for the CLI
+        count = sum(1 for _ in _query(case["engine"], source, runtime, options))
+        samples.append(perf_counter() - tic)
+
+    p50 = latency(samples)["p50"] / 1000
+    return {
+        "results": count,
+        "latency_ms": latency(samples),
+        "files_per_s": case["files"] / p50,
+        "mb_per_s": case["bytes"] / p50 / (1 << 20),
+    }
+
+
+def run_case(case: dict) -> dict:
+    """Run one measurement, meant to be called in a fresh process."""
+    result = _index_case(case) if case["kind"] == "index" else _search_case(case)
+    result["peak_rss"] = peak_rss()
+    return result
+
+
+def cases(root: Path, work: Path, repeat: int, jobs: int) -> Iterable[dict]:
+    files, size = corpus_size(root)
+    common = {"root": str(root), "files": files, "bytes": size, "jobs": jobs}
+
+    for backend in BACKENDS:
+        index = str(work / f"index{backend}")
+        yield {**common, "name": f"index{backend}", "kind": "index", "index": index}
+
+    for engine in ENGINES:
+        for backend in (None, *BACKENDS):
+            source = str(root) if backend is None else str(work / f"index{backend}")
+            yield {
+                **common,
+                "name": f"{engine}/{backend or 'runtime'}",
+                "kind": "search",
+                "engine": engine,
+                "backend": backend,
+                "source": source,
+                "repeat": repeat,
+            }
+
+
+def run(
+    spec: CorpusSpec,
+    corpus: Path | None = None,
+    repeat: int = 5,
+    jobs: int = 1,
+    log: Callable[[str], None] = print,
+) -> dict:
+    """Measure every engine and backend on corpus generated by `spec`.
+
+    Corpus is generated into `corpus` unless it already exists there, or
+    into temporary directory. Every case runs in a new process, so its
+    peak memory is not affected by cases run before it.
+    """
+    with tempfile.TemporaryDirectory(prefix="cli-indexer-bench-") as tmp:
+        work = Path(tmp)
+        root = corpus if corpus is not None else work / "corpus"
+        if not root.exists():
+            log(f"generating corpus in {root}")
+            generate(root, spec)
+
+        results = {}
+        spawn = get_context("spawn")
+        for case in cases(root, work, repeat, jobs):
+            log(f"running {case['name']}")
+            with spawn.Pool(1) as pool:
+                results[case["name"]] = pool.apply(run_case, (case,))
+
+    return {
+        "version": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": asdict(spec),
+        "corpus": None if corpus is None else str(corpus),
+        "repeat": repeat,
+        "jobs": jobs,
+        "results": results,
+    }
+
+
+def _headline(result: dict) -> float:
+    """Milliseconds representing the case, lower is better."""
+    if "latency_ms" in result:
+        return result["latency_ms"]["p50"]
+    return result["seconds"] * 1000
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    """Lines comparing headline times and peak memory of two runs."""
+    lines = []
+    for name, result in new["results"].items():
+        if (before := old["results"].get(name)) is None:
+            lines.append(f"{name:24} new")
+            continue
+        a, b = _headline(before), _headline(result)
+        change = (b - a) / a if a else 0.0
+        line = f"{name:24} {a:10.1f} ms -> {b:10.1f} ms {change:+8.1%}"
+        if before.get("peak_rss") and result.get("peak_rss"):
+            rss_a, rss_b = before["peak_rss"] >> 20, result["peak_rss"] >> 20
+            line += f"   rss {rss_a} MB -> {rss_b} MB"
+        lines.append(line)
+    return lines
@@ -0,0 +1,70 @@
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+IMPORT_BUDGET_MS = 100.0
+"""Most time a search command may spend importing modules of the project."""
+
+
+def _commands(root: str) -> dict[str, list[str]]:
+    return {
+        "info": ["info", "x", root],
+        "searchfd": ["searchfd", "x", root],
+        "searchfdi": ["searchfdi", "x", "x", root],
+        "help": ["help"],
+    }
+
+
+def import_ms(args: list[str]) -> float:
+    """Time spent importing modules by Python running `args`, in milliseconds."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # only top level imports, nested ones are part of their cumulative time
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1000
+
+
+def wall_ms(args: list[str]) -> float:
+    tic = perf_counter()
+    subprocess.run(
+        [sys.executable, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return (perf_counter() - tic) * 1000
+
+
+def startup(repeat: int = 10) -> dict:
+    """Measure start of CLI for every command on empty directory.
+
+    Import time is the median over `repeat` runs minus imports of bare
+    interpreter, wall time includes everything.
+    """
+    interpreter = statistics.median(import_ms(["-c", "pass"]) for _ in range(repeat))
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        for name, args in _commands(root).items():
+            cmd = [str(MAIN), *args]
+            imports = statistics.median(import_ms(cmd) for _ in range(repeat))
+            results[name] = {
+                "import_ms": imports - interpreter,
+                "wall_ms": statistics.median(wall_ms(cmd) for _ in range(repeat)),
+            }
+    return results
+
+
+def over_budget(results: dict, budget: float = IMPORT_BUDGET_MS) -> list[str]:
+    """Commands whose import time exceeds `budget`."""
+    return [name for name, result in results.items() if result["import_ms"] > budget]
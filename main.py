@@ -1,26 +1,47 @@
 #!/usr/bin/env python3
-from app import (
-    Indexer,
-    CLIApplication,
-    SearchInfoEngine,
-    SearchFileDirEngine,
-    SearchFileDirInfoEngine,
-)
-from app.command import (
-    IndexCommand,
-    SearchFileDirCommand,
-    SearchInfoCommand,
-    SearchFileDirInfoCommand,
-)
+from app.cli import CLIApplication
+from app.command import docs
 import sys
 
 
-def main():
-    indexer = Indexer()
-    si_engine = SearchInfoEngine()
-    sfd_engine = SearchFileDirEngine()
-    sfdi_engine = SearchFileDirInfoEngine()
+# commands are created on first use, so their modules and dependencies
+# (engines, index backends, sqlite3, ...) are imported only when they run,
+# help prints their usage from app.command.docs
+def index_command():
+    from app.command.index import IndexCommand
+    from app.core import Indexer
+
+    return IndexCommand(Indexer())
+
+
+def info_command():
+    from app.command.info import SearchInfoCommand
+    from app.core import SearchInfoEngine
+
+    return SearchInfoCommand(SearchInfoEngine())
+
+
+def searchfd_command():
+    from app.command.searchfd import SearchFileDirCommand
+    from app.core import SearchFileDirEngine
+
+    return SearchFileDirCommand(SearchFileDirEngine())
+
+
+def searchfdi_command():
+    from app.command.searchfdi import SearchFileDirInfoCommand
+    from app.core import SearchFileDirInfoEngine
 
+    return SearchFileDirInfoCommand(SearchFileDirInfoEngine())
+
+
+def watch_command():
+    from app.command.watch import WatchCommand
+
+    return WatchCommand()
+
+
+def main():
     # sys.argv = ["main.py", "index", "."]
     # sys.argv = ["main.py", "info", "xxx", "."]
     # sys.argv = ["main.py", "info", "xxx", "-i", "index.pkl"]
@@ -31,10 +52,18 @@ def main():
     # sys.argv = ["main.py", "searchfdi", "ext", "-i", "i.pkl"]
 
     cli = CLIApplication()
-    cli.register_command(IndexCommand(indexer))
-    cli.register_command(SearchInfoCommand(si_engine))
-    cli.register_command(SearchFileDirCommand(sfd_engine))
-    cli.register_command(SearchFileDirInfoCommand(sfdi_engine))
+
+    def serve_command():
+        from app.command.serve import ServeCommand
+
+        return ServeCommand(cli.dispatch)
+
+    cli.register_lazy_command("index", index_command, docs.INDEX)
+    cli.register_lazy_command("info", info_command, docs.INFO)
+    cli.register_lazy_command("searchfd", searchfd_command, docs.SEARCHFD)
+    cli.register_lazy_command("searchfdi", searchfdi_command, docs.SEARCHFDI)
+    cli.register_lazy_command("watch", watch_command, docs.WATCH)
+    cli.register_lazy_command("serve", serve_command, docs.SERVE)
     cli.run()
 
 
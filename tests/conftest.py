@@ -0,0 +1,37 @@
+from pathlib import Path
+import pytest
+
+FILES = {
+    "a.txt": "first line\nneedle in haystack\nlast needle\n",
+    "b.md": "nothing here\nstill nothing\n",
+    "crlf.txt": "one\r\ntwo needle\r\nthree\r\n",
+    "cr.txt": "one\rneedle two\rthree",
+    "breaks.txt": "one\fneedle\u2028two needle\x85three\vneedle four\x1e\n",
+    "unicode.txt": "ünïcode needle ✓\nplain\n",
+    "sub/c.txt": "abcd\nneedle abc\nbcd only\n",
+    "sub/needle_name.txt": "no match inside\n",
+    "sub/deep/d.py": "def needle():\n    return 'needle'\n",
+    "sub/deep/e.py": "import os\n",
+    "other/f.txt": "(a)aa and xaa\nNeedle capital\n",
+    "other/ignored.log": "needle in ignored file\n",
+    "other/.gitignore": "*.log\n",
+}
+
+
+def write_tree(root: Path, files: dict[str, str | bytes]):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_bytes(content.encode("utf-8"))
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    """Small tree of text files, binary file and ignored file."""
+    root = tmp_path / "tree"
+    write_tree(root, FILES)
+    (root / "binary.bin").write_bytes(b"\0needle\0" * 10)
+    return root
@@ -0,0 +1,101 @@
+from pathlib import Path
+import pytest
+from app.backends import create_index, load_index
+from app.core import (
+    Indexer,
+    SearchFileDirEngine,
+    SearchFileDirInfoEngine,
+    SearchInfoEngine,
+)
+from app.entity import SearchOptions
+from app.index import Index
+from app.mapped import MappedIndexWriter
+
+BACKENDS = (".pkl", ".idx", ".idx-zlib", ".idx-lzma", ".db", ".shards")
+INFO_QUERIES = (
+    ("needle", False),
+    ("ne", False),
+    ("abc", False),
+    (["abc", "bcd"], False),
+    (["needle", "zz"], False),
+    ("ne+dle", True),
+    (["zzz", r"(a)\1"], True),
+    (["zzz", "(?i)needle"], True),
+)
+
+
+def build(root: Path, dst: Path):
+    """Create index of `root` in format given by suffix of `dst`."""
+    suffix, _, compression = dst.suffix.partition("-")
+    if compression:
+        dst = dst.with_suffix(suffix)
+        index = MappedIndexWriter(dst, compression, block_size=64)
+    else:
+        index = create_index(dst)
+    if isinstance(index, Index):
+        Indexer.update_index(root, index)
+    else:
+        Indexer.make_index(root, index)
+    index.dump()
+    return load_index(dst)
+
+
+def results(found) -> list[dict]:
+    return sorted((out.as_dict() for out in found), key=lambda d: d["path"])
+
+
+@pytest.fixture(params=BACKENDS)
+def index(request, tree: Path, tmp_path: Path):
+    return build(tree, tmp_path / f"index{request.param}")
+
+
+@pytest.mark.parametrize("query, regex", INFO_QUERIES)
+def test_info_matches_runtime(tree: Path, index, query, regex):
+    options = SearchOptions(regex=regex)
+    expected = results(SearchInfoEngine.search_runtime(query, tree, options))
+    assert expected or query == ["zzz", r"(a)\1"]
+    assert results(SearchInfoEngine.search_index(query, index, options)) == expected
+
+
+@pytest.mark.parametrize(
+    "name, regex", (("needle", False), ("deep", False), (r"\.py$", True))
+)
+def test_searchfd_matches_runtime(tree: Path, index, name, regex):
+    options = SearchOptions(regex=regex)
+    expected = results(SearchFileDirEngine.search_runtime(name, tree, options))
+    assert expected
+    found = SearchFileDirEngine.search_index(name, index, options)
+    # index holds files only, directories are found by runtime search
+    assert results(found) == [d for d in expected if Path(d["path"]).is_file()]
+
+
+def test_searchfdi_matches_runtime(tree: Path, index):
+    expected = results(SearchFileDirInfoEngine.search_runtime("sub", "needle", tree))
+    assert expected
+    found = SearchFileDirInfoEngine.search_index("sub", "needle", index)
+    assert results(found) == expected
+
+
+def test_binary_and_ignored_files_are_skipped(index):
+    paths = {Path(p).name for p in index.keys()}
+    assert "binary.bin" not in paths
+    assert "ignored.log" not in paths
+    assert "a.txt" in paths
+
+
+def test_line_endings(tree: Path, index):
+    found = {
+        Path(d["path"]).name: [line["line"] for line in d["lines"]]
+        for d in results(SearchInfoEngine.search_index("needle", index))
+    }
+    assert found["crlf.txt"] == [2]
+    assert found["cr.txt"] == [2]
+    assert found["breaks.txt"] == [2, 3, 5]
+
+
+def test_trigram_filter_skips_files_without_literal(tree: Path, index):
+    candidates = {Path(path).name for path, _ in index.candidates("needle")}
+    assert candidates
+    assert "e.py" not in candidates and "b.md" not in candidates
+    everything = {Path(path).name for path, _ in index.candidates(None)}
+    assert candidates < everything
@@ -0,0 +1,65 @@
+from pathlib import Path
+import pytest
+from app.ignore import IgnoreRules
+from app.walker import walk_files
+from .conftest import write_tree
+
+RULES = """
+# comment
+*.log
+!keep.log
+build/
+/top.txt
+docs/**/*.tmp
+\\#hash
+"""
+
+
+@pytest.fixture
+def rules(tmp_path: Path) -> IgnoreRules:
+    (tmp_path / ".gitignore").write_text(RULES)
+    loaded = IgnoreRules.load(str(tmp_path), None)
+    assert loaded is not None
+    return loaded
+
+
+@pytest.mark.parametrize(
+    "path, is_dir, ignored",
+    (
+        ("a.log", False, True),
+        ("sub/a.log", False, True),
+        ("keep.log", False, False),
+        ("build", True, True),
+        ("build", False, False),
+        ("sub/build", True, True),
+        ("top.txt", False, True),
+        ("sub/top.txt", False, False),
+        ("docs/a/b/c.tmp", False, True),
+        ("other/c.tmp", False, False),
+        ("#hash", False, True),
+        ("a.txt", False, False),
+    ),
+)
+def test_gitignore_semantics(
+    tmp_path: Path, rules: IgnoreRules, path, is_dir, ignored
+):
+    assert rules.ignored(str(tmp_path / path), is_dir) == ignored
+
+
+def test_rules_of_subdirectory_override_parent(tmp_path: Path):
+    write_tree(
+        tmp_path,
+        {
+            ".gitignore": "*.log\n",
+            "sub/.gitignore": "!keep.log\n",
+            "a.log": "",
+            "sub/keep.log": "",
+            "sub/other.log": "",
+            "sub/build/x.txt": "",
+            ".git/config": "",
+        },
+    )
+    found = sorted(
+        Path(p).relative_to(tmp_path).as_posix() for p in walk_files(tmp_path)
+    )
+    assert found == [".gitignore", "sub/.gitignore", "sub/build/x.txt", "sub/keep.log"]
@@ -0,0 +1,97 @@
+from pathlib import Path
+import pytest
+from app.core import Indexer
+from app.exceptions import CLIIndexerException
+from app.mapped import HEADER, MappedIndex, MappedIndexWriter
+from app.stats import Stats
+from app.context import Context
+
+
+def build(root: Path, dst: Path, compression: str | None, block_size: int = 64):
+    writer = MappedIndexWriter(dst, compression, block_size)
+    Indexer.make_index(root, writer)
+    writer.dump()
+    return MappedIndex.load(dst)
+
+
+@pytest.fixture
+def plain(tree: Path, tmp_path: Path) -> MappedIndex:
+    return build(tree, tmp_path / "plain.idx", None)
+
+
+@pytest.mark.parametrize("compression", ("zlib", "lzma"))
+@pytest.mark.parametrize("block_size", (1, 64, 1 << 16))
+def test_compressed_lines_match_plain(
+    tree: Path, tmp_path: Path, plain: MappedIndex, compression, block_size
+):
+    index = build(tree, tmp_path / "packed.idx", compression, block_size)
+    assert index.compression == compression
+    assert list(index.items()) == list(plain.items())
+    for literal in (None, "ne", "needle", "abc", "missing"):
+        expected = [(path, list(lines)) for path, lines in plain.candidates(literal)]
+        found = [(path, list(lines)) for path, lines in index.candidates(literal)]
+        assert found == expected
+
+
+def test_blocks_hold_whole_files(tree: Path, tmp_path: Path):
+    index = build(tree, tmp_path / "packed.idx", "zlib", block_size=1)
+    files = sum(1 for _ in index.files())
+    # every file closes its own block, so files are not split between blocks
+    assert len(index._block_starts) - 1 == files
+
+
+def test_only_candidate_blocks_are_decompressed(tree: Path, tmp_path: Path):
+    index = build(tree, tmp_path / "packed.idx", "zlib", block_size=1)
+    Context.stats = stats = Stats()
+    try:
+        found = [path for path, lines in index.candidates("abcd") if list(lines)]
+    finally:
+        Context.stats = None
+    assert [Path(path).name for path in found] == ["c.txt"]
+    assert stats.counters["blocks"] == 1
+
+
+def test_plain_index_has_no_blocks(plain: MappedIndex):
+    assert plain.compression is None
+    assert len(plain._block_starts) == 0
+
+
+def test_index_of_other_version_is_rejected(tmp_path: Path, plain: MappedIndex):
+    data = bytearray(plain.dst.read_bytes())
+    magic, _, *rest = HEADER.unpack_from(data)
+    HEADER.pack_into(data, 0, magic, 1, *rest)
+    old = tmp_path / "old.idx"
+    old.write_bytes(bytes(data))
+    with pytest.raises(CLIIndexerException, match="other version"):
+        MappedIndex.load(old)
+
+
+def test_unknown_compression_is_rejected(tmp_path: Path):
+    with pytest.raises(CLIIndexerException):
+        MappedIndexWriter(tmp_path / "index.idx", "gzip")
+
+
+@pytest.mark.parametrize("size", (0, 10, HEADER.size, HEADER.size + 20, -1))
+def test_truncated_index_is_rejected(tmp_path: Path, plain: MappedIndex, size):
+    data = plain.dst.read_bytes()
+    damaged = tmp_path / "damaged.idx"
+    damaged.write_bytes(data[:size])
+    with pytest.raises(CLIIndexerException, match="may be damaged"):
+        MappedIndex.load(damaged)
+
+
+def test_damaged_meta_is_rejected(tmp_path: Path, plain: MappedIndex):
+    data = bytearray(plain.dst.read_bytes())
+    meta_start = HEADER.unpack_from(data)[3]
+    data[meta_start] = ord("x")
+    damaged = tmp_path / "damaged.idx"
+    damaged.write_bytes(bytes(data))
+    with pytest.raises(CLIIndexerException, match="may be damaged"):
+        MappedIndex.load(damaged)
+
+
+def test_dump_replaces_index_at_once(tree: Path, tmp_path: Path):
+    dst = tmp_path / "index.idx"
+    dst.write_bytes(b"old")
+    build(tree, dst, None)
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
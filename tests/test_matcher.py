@@ -0,0 +1,31 @@
+from app.matcher import make_matcher
+
+
+def test_backreference_in_later_pattern():
+    matcher = make_matcher(["zzz", r"(a)\1"], regex=True)
+    assert list(matcher.spans("xaa")) == [1, 3]
+    assert matcher.tagged("xaa")[1] == (r"(a)\1",)
+
+
+def test_inline_flag_in_later_pattern():
+    matcher = make_matcher(["zzz", "(?i)abc"], regex=True)
+    assert list(matcher.spans("xABC")) == [1, 4]
+
+
+def test_overlapping_patterns_are_all_tagged():
+    matcher = make_matcher(["abc", "bcd"])
+    spans, tags = matcher.tagged("abcd")
+    assert list(spans) == [0, 4]
+    assert tags == ("abc", "bcd")
+
+
+def test_line_without_pattern():
+    spans, tags = make_matcher(["abc", "bcd"]).tagged("xyz")
+    assert len(spans) == 0
+    assert tags == ()
+
+
+def test_literals_of_patterns():
+    assert make_matcher(["abc", "bcd"]).literals == ("abc", "bcd")
+    assert make_matcher(["abc", "bcd"], regex=True).literals == ("abc", "bcd")
+    assert make_matcher(["abc", "b.d"], regex=True).literals is None
@@ -0,0 +1,26 @@
+import multiprocessing
+import time
+from itertools import islice
+from app.parallel import parallel_map
+
+
+def slow_square(x: int) -> int:
+    time.sleep(0.001)
+    return x * x
+
+
+def test_results_in_order_of_items():
+    assert list(parallel_map(slow_square, range(50), jobs=3, chunksize=4)) == [
+        x * x for x in range(50)
+    ]
+
+
+def test_closing_early_shuts_pool_down():
+    for _ in range(20):
+        results = parallel_map(slow_square, range(10_000), jobs=3, chunksize=1)
+        assert list(islice(results, 3)) == [0, 1, 4]
+        tic = time.perf_counter()
+        results.close()
+        # queued items are skipped, not computed
+        assert time.perf_counter() - tic < 2
+        assert multiprocessing.active_children() == []
@@ -0,0 +1,49 @@
+import sqlite3
+from pathlib import Path
+import pytest
+from app.exceptions import CLIIndexerException
+from app.index import IndexDB
+from app.mapped import MappedIndex
+from .test_backends import BACKENDS, build
+
+NAMES = ("needle", "deep", "ee", "sub", "c.t", "txt", "missing")
+
+
+@pytest.fixture(params=BACKENDS)
+def index(request, tree: Path, tmp_path: Path):
+    return build(tree, tmp_path / f"index{request.param}")
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_path_candidates_hold_every_matching_path(index, name):
+    expected = [path for path in index.keys() if name in path]
+    found = [path for path in index.path_candidates(name) if name in path]
+    assert found == expected
+
+
+def test_mapped_index_looks_up_names(tree: Path, tmp_path: Path, monkeypatch):
+    index = build(tree, tmp_path / "index.idx")
+    expected = sorted(path for path in index.keys() if "deep" in path)
+    monkeypatch.setattr(MappedIndex, "keys", lambda self: pytest.fail("scanned"))
+    assert sorted(index.path_candidates("deep")) == expected
+    assert len(expected) == 2
+
+
+def test_database_looks_up_path_trigrams(tree: Path, tmp_path: Path):
+    index = build(tree, tmp_path / "index.db")
+    plan = index.connection.execute(
+        "EXPLAIN QUERY PLAN SELECT path FROM path_trigrams WHERE path_trigrams MATCH ?",
+        ('"deep"',),
+    ).fetchall()
+    assert any("VIRTUAL TABLE INDEX" in row[-1] for row in plan)
+    assert len(list(index.path_candidates("deep"))) == 2
+
+
+def test_database_of_older_version_is_rejected(tree: Path, tmp_path: Path):
+    dst = tmp_path / "index.db"
+    build(tree, dst).close()
+    with sqlite3.connect(dst) as connection:
+        connection.execute("DROP TABLE path_trigrams")
+    connection.close()
+    with pytest.raises(CLIIndexerException, match="other version"):
+        IndexDB.load(dst)
@@ -0,0 +1,84 @@
+from pathlib import Path
+import pytest
+from app.core import SearchFileDirInfoEngine, SearchInfoEngine
+from app.entity import SearchOptions
+from app.shards import ShardedIndex, shard_of
+from .test_backends import BACKENDS, build, results
+from .test_update import index_command
+
+PATTERNS = ["abc", "needle", "zzz", "first"]
+
+
+@pytest.fixture(params=BACKENDS)
+def index(request, tree: Path, tmp_path: Path):
+    return build(tree, tmp_path / f"index{request.param}")
+
+
+def paths(found) -> list[str]:
+    return [out.fpath for out in found]
+
+
+@pytest.mark.parametrize("patterns", (PATTERNS, ["ab", "needle"], ["abc", "ne"]))
+def test_results_in_index_order_whatever_order_of_patterns(index, patterns):
+    found = paths(SearchInfoEngine.search_index(patterns, index))
+    reverse = paths(SearchInfoEngine.search_index(patterns[::-1], index))
+    everything = paths(SearchInfoEngine.search_index("", index))
+    assert found == reverse
+    assert found == [path for path in everything if path in found]
+
+
+def test_candidates_any_is_union_of_candidates(index):
+    expected = set()
+    for literal in PATTERNS:
+        expected.update(
+            (path, *line) for path, lines in index.candidates(literal) for line in lines
+        )
+    found = {
+        (path, *line)
+        for path, lines in index.candidates_any(PATTERNS)
+        for line in lines
+    }
+    # every file of single literal is found, lines containing it too
+    assert {(path, i) for path, i, _ in found} >= {
+        (path, i) for path, i, line in expected if any(p in line for p in PATTERNS)
+    }
+
+
+@pytest.fixture
+def sharded(tree: Path, tmp_path: Path) -> Path:
+    dst = tmp_path / "index.shards"
+    index_command(tree, "-o", dst, "--shards", "3")
+    return dst
+
+
+def test_every_shard_is_loaded_once(sharded: Path, monkeypatch):
+    loads = []
+    shard = ShardedIndex.shard
+    monkeypatch.setattr(
+        ShardedIndex, "shard", lambda self, i: loads.append(i) or shard(self, i)
+    )
+    index = ShardedIndex.load(sharded)
+
+    list(SearchInfoEngine.search_index(PATTERNS, index))
+    assert sorted(loads) == [0, 1, 2]
+
+    loads.clear()
+    list(SearchFileDirInfoEngine.search_index("sub", PATTERNS, index))
+    assert sorted(loads) == [0, 1, 2]
+
+
+def test_limit_stops_before_other_shards(sharded: Path, monkeypatch):
+    loads = []
+    shard = ShardedIndex.shard
+    monkeypatch.setattr(
+        ShardedIndex, "shard", lambda self, i: loads.append(i) or shard(self, i)
+    )
+    index = ShardedIndex.load(sharded)
+    first = next(iter(SearchInfoEngine.search_index(PATTERNS, index)))
+    options = SearchOptions(limit=1)
+
+    loads.clear()
+    found = paths(SearchInfoEngine.search_index(PATTERNS, index, options))
+    assert found == [first.fpath]
+    # shards after the one holding first result are never loaded
+    assert loads == list(range(shard_of(first.fpath, 3) + 1))
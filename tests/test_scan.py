@@ -0,0 +1,27 @@
+from pathlib import Path
+import pytest
+from app.scan import scan_lines, split_lines
+
+TEXT = "a\r\nb\rc\fd\ve\x1cf\x85g\u2028h\u2029i\r\n\nj\r"
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 3, 5, 1 << 20))
+def test_scan_lines_split_like_splitlines(tmp_path: Path, chunk_size):
+    path = tmp_path / "breaks.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    expected = list(enumerate(TEXT.splitlines(), start=1))
+    assert list(scan_lines(str(path), None, chunk_size)) == expected
+    assert split_lines(TEXT.encode("utf-8")) == TEXT.splitlines()
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 4, 1 << 20))
+def test_scan_lines_finds_needle_between_breaks(tmp_path: Path, chunk_size):
+    path = tmp_path / "breaks.txt"
+    path.write_bytes("x\u2028ab\x85ab\fx".encode("utf-8"))
+    assert list(scan_lines(str(path), b"ab", chunk_size)) == [(2, "ab"), (3, "ab")]
+    assert list(scan_lines(str(path), b"x\x0cab", chunk_size)) == []
+
+
+@pytest.mark.parametrize("text", ("", "a", "a\n", "a\n\n", "\u2028", "é\r"))
+def test_split_lines_matches_splitlines(text: str):
+    assert split_lines(text.encode("utf-8")) == text.splitlines()
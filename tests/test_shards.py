@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+import pytest
+from app.backends import load_index
+from app.core import SearchFileDirInfoEngine, SearchInfoEngine
+from app.entity import SearchOptions
+from app.exceptions import CLIIndexerException
+from app.mapped import MappedIndex
+from app.shards import ShardedIndex, shard_of
+from .test_backends import results
+from .test_update import index_command
+
+
+@pytest.fixture
+def sharded(tree: Path, tmp_path: Path) -> Path:
+    dst = tmp_path / "index.shards"
+    index_command(tree, "-o", dst, "--shards", "3")
+    return dst
+
+
+def test_shard_of_ignores_spelling_of_root(tree: Path, monkeypatch):
+    monkeypatch.chdir(tree.parent)
+    relative = os.path.join(tree.name, "sub", "c.txt")
+    assert shard_of(relative, 7) == shard_of(str(tree / "sub" / "c.txt"), 7)
+
+
+def test_every_file_is_in_its_shard(sharded: Path):
+    index = ShardedIndex.load(sharded)
+    for i in range(len(index.shards)):
+        assert all(shard_of(path, 3) == i for path in index.shard(i).keys())
+
+
+@pytest.mark.parametrize("jobs", (1, 2, 3))
+def test_fan_out_matches_single_index(tree: Path, tmp_path: Path, sharded, jobs):
+    single = tmp_path / "index.pkl"
+    index_command(tree, "-o", single)
+    options = SearchOptions(jobs=jobs)
+
+    found = SearchInfoEngine.search_index("needle", load_index(sharded), options)
+    expected = SearchInfoEngine.search_index("needle", load_index(single))
+    assert results(found) == results(expected)
+
+    found = SearchFileDirInfoEngine.search_index(
+        "sub", ["abc", "bcd"], load_index(sharded), options
+    )
+    expected = SearchFileDirInfoEngine.search_index(
+        "sub", ["abc", "bcd"], load_index(single)
+    )
+    assert results(found) == results(expected)
+
+
+def test_fan_out_respects_limit(sharded: Path):
+    options = SearchOptions(jobs=3, limit=2)
+    found = SearchInfoEngine.search_index("needle", load_index(sharded), options)
+    assert len(list(found)) == 2
+
+
+def test_rebuild_shard_with_other_spelling_of_root(tree: Path, sharded, monkeypatch):
+    monkeypatch.chdir(tree.parent)
+    before = sorted(map(os.path.abspath, load_index(sharded).keys()))
+    (tree / "sub" / "c.txt").write_text("changed\n")
+
+    for i in range(3):
+        index_command(tree.name, "-o", sharded, "--shard", str(i))
+
+    after = sorted(map(os.path.abspath, load_index(sharded).keys()))
+    assert after == before
+
+
+def test_rebuild_shard_of_other_root_is_rejected(tmp_path: Path, sharded):
+    other = tmp_path / "other"
+    other.mkdir()
+    with pytest.raises(CLIIndexerException):
+        index_command(other, "-o", sharded, "--shard", "0")
+    with pytest.raises(CLIIndexerException):
+        index_command(other, "-o", sharded, "--update")
+
+
+def test_compressed_shards_keep_compression(tree: Path, tmp_path: Path):
+    dst = tmp_path / "index.shards"
+    index_command(
+        tree, "-o", dst, "--shards", "2", "--shard-type", ".idx", "--compress", "lzma"
+    )
+    index_command(tree, "-o", dst, "--shard", "1")
+
+    for shard in ShardedIndex.load(dst).shards:
+        assert MappedIndex.load(shard).compression == "lzma"
@@ -0,0 +1,27 @@
+from pathlib import Path
+import pytest
+from app.context import Context
+from app.core import Indexer
+from app.index import Index
+from app.stats import Stats
+
+
+@pytest.fixture
+def stats():
+    Context.stats = stats = Stats()
+    yield stats
+    Context.stats = None
+
+
+@pytest.mark.parametrize("jobs, walk", ((1, "walk"), (2, "walk_feed")))
+def test_indexing_counts_files_and_lines(tree: Path, tmp_path: Path, stats, jobs, walk):
+    index = Index(tmp_path / "index.pkl")
+    Indexer.update_index(tree, index, jobs)
+
+    files = [lines for _, lines in index.files()]
+    assert stats.counters["files"] == len(files)
+    assert stats.counters["lines"] == sum(map(len, files))
+    # binary file is read too, but it is not decoded
+    assert stats.counters["files_read"] == len(files) + 1
+    assert stats.calls["decode"] == len(files)
+    assert stats.calls["read"] > 0 and walk in stats.calls
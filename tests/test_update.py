@@ -0,0 +1,58 @@
+import os
+from pathlib import Path
+import pytest
+from app.backends import load_index
+from app.command.index import IndexCommand
+from app.core import Indexer, SearchInfoEngine
+from app.index import Index
+from .test_backends import results
+
+
+def index_command(*args: str | Path):
+    IndexCommand(Indexer()).execute([str(arg) for arg in args])
+
+
+def change_tree(root: Path):
+    """Add, modify and delete file, modified file keeps its size."""
+    (root / "added.txt").write_text("added needle\n")
+    modified = root / "sub" / "c.txt"
+    st = modified.stat()
+    modified.write_text(modified.read_text().replace("needle", "NEEDLE"))
+    os.utime(modified, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    (root / "a.txt").unlink()
+
+
+@pytest.mark.parametrize("suffix", (".pkl", ".shards"))
+def test_update_after_add_modify_delete(tree: Path, tmp_path: Path, suffix, capsys):
+    dst = tmp_path / f"index{suffix}"
+    index_command(tree, "-o", dst)
+    change_tree(tree)
+    index_command(tree, "-o", dst, "--update")
+    assert "Updated index file" in capsys.readouterr().out
+
+    expected = results(SearchInfoEngine.search_runtime("needle", tree))
+    names = {Path(d["path"]).name for d in expected}
+    assert "added.txt" in names and "a.txt" not in names and "c.txt" not in names
+    assert results(SearchInfoEngine.search_index("needle", load_index(dst))) == expected
+
+
+def test_update_reads_only_changed_files(tree: Path, tmp_path: Path):
+    dst = tmp_path / "index.pkl"
+    index = Index(dst)
+    Indexer.update_index(tree, index)
+    signatures = {path: index.signature(path) for path in index.signed_paths()}
+
+    change_tree(tree)
+    inserted = []
+    insert = index.insert
+
+    def record(path: str, lines: list[str]):
+        inserted.append(Path(path).name)
+        insert(path, lines)
+
+    index.insert = record  # type: ignore
+    Indexer.update_index(tree, index)
+
+    assert sorted(inserted) == ["added.txt", "c.txt"]
+    assert str(tree / "a.txt") not in set(index.signed_paths())
+    assert index.signature(str(tree / "b.md")) == signatures[str(tree / "b.md")]
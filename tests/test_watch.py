@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+import pytest
+from app.core import SearchInfoEngine
+from app.index import Index
+from app.watch import IndexWatcher, PollingBackend
+from .test_backends import results
+from .test_update import change_tree, index_command
+
+
+def watcher(root: Path, dst: Path) -> IndexWatcher:
+    return IndexWatcher(root, Index(dst), backend=PollingBackend(str(root)))
+
+
+def assert_up_to_date(root: Path, index: Index):
+    expected = results(SearchInfoEngine.search_runtime("needle", root))
+    assert results(SearchInfoEngine.search_index("needle", index)) == expected
+
+
+def test_start_syncs_index(tree: Path, tmp_path: Path):
+    watch = watcher(tree, tmp_path / "index.pkl")
+    assert watch.start() > 0
+    assert_up_to_date(tree, watch.index)
+    assert watch.start() == 0
+
+
+def test_file_events_are_applied(tree: Path, tmp_path: Path):
+    watch = watcher(tree, tmp_path / "index.pkl")
+    watch.start()
+    change_tree(tree)
+    events = [
+        (str(tree / name), False) for name in ("added.txt", "a.txt", "sub/c.txt")
+    ]
+    assert watch.apply(events) == 3
+    assert_up_to_date(tree, watch.index)
+
+
+def test_new_ignore_file_rescans_directory(tree: Path, tmp_path: Path):
+    watch = watcher(tree, tmp_path / "index.pkl")
+    watch.start()
+    (tree / "sub" / ".gitignore").write_text("deep/\n")
+    watch.apply([(str(tree / "sub" / ".gitignore"), False)])
+    assert not any("deep" in path for path in watch.index.signed_paths())
+    assert_up_to_date(tree, watch.index)
+
+
+def test_removed_directory_is_forgotten(tree: Path, tmp_path: Path):
+    watch = watcher(tree, tmp_path / "index.pkl")
+    watch.start()
+    deep = tree / "sub" / "deep"
+    for name in os.listdir(deep):
+        (deep / name).unlink()
+    deep.rmdir()
+    watch.apply([(str(deep), True)])
+    assert not any("deep" in path for path in watch.index.signed_paths())
+    assert_up_to_date(tree, watch.index)
+
+
+@pytest.mark.parametrize("spelling", ("./tree", "tree/", "tree/../tree"))
+def test_root_is_spelled_as_by_index_command(tree: Path, monkeypatch, spelling):
+    monkeypatch.chdir(tree.parent)
+    dst = Path("index.pkl")
+    index_command(spelling, "-o", dst)
+    index = Index.load(dst)
+    paths = sorted(index.keys())
+
+    watch = IndexWatcher(spelling, index, backend=PollingBackend(spelling))
+    assert watch.start() == 0
+    assert sorted(index.keys()) == paths
+
+
+def test_churning_files_do_not_grow_path_table(tree: Path, tmp_path: Path):
+    watch = watcher(tree, tmp_path / "index.pkl")
+    watch.start()
+    watch.index.dump()
+    size = len(watch.index._paths)
+
+    for i in range(50):
+        churn = tree / f"dir{i}" / f"churn{i}.txt"
+        churn.parent.mkdir()
+        churn.write_text("needle\n")
+        watch.apply([(str(churn.parent), True)])
+        churn.unlink()
+        churn.parent.rmdir()
+        watch.apply([(str(churn.parent), True)])
+        watch.index.dump()
+
+    assert len(watch.index._paths) < 2 * size
+    assert_up_to_date(tree, Index.load(watch.index.dst))